@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+#####
+#  Eliott THOMAS — 21 164 874
+#  Lilian FAVRE GARCIA — 21 153 421
+#  Tsiory Razafindramisa — 21 145 627
+###
+
+import numpy as np
+import sys
+import solution_regression as sr
+import gestion_donnees as gd
+from regression import diagnostic_apprentissage
+
+
+def experience_monte_carlo(modele_gen, liste_nb_train, nb_test, bruits, degres, lambdas, nb_realisations):
+    """
+    Fonction qui evalue la regression pour toutes les configurations (nb_train, bruit, M, lambda)
+    sur ``nb_realisations`` realisations du bruit chacune, dans un seul processus.
+
+    Pour un nb_train donne, les entrees x sont les memes pour toutes les realisations : les cibles
+    forment une matrice [N, nb_realisations] et, pour chaque degre M, une seule base phi (et une seule
+    SVD, voir ``Regression.chemin_regularisation``) sert a toutes les realisations et a tous les lambdas.
+
+    Retourne un dictionnaire de colonnes (tableaux 1D Numpy de meme longueur), une rangee par
+    (nb_train, bruit, M, lambda, realisation).
+    """
+    w = [0.3, 4.1]  # Parametres du modele generatif
+    lambdas = np.asarray(lambdas, dtype=float)
+    colonnes = {'nb_train': [], 'bruit': [], 'M': [], 'lamb': [], 'realisation': [],
+                'erreur_entrainement': [], 'erreur_test': []}
+
+    for nb_train in liste_nb_train:
+        for bruit in bruits:
+            gestionnaire_donnees = gd.GestionDonnees(w, modele_gen, nb_train, nb_test, bruit)
+            [x_train, t_train, x_test, t_test] = gestionnaire_donnees.generer_donnees_lot(nb_realisations)
+
+            for m in degres:
+                regression = sr.Regression(lambdas[0], m)
+                poids = regression.chemin_regularisation(x_train, t_train, lambdas)  # [L, M+1, nb_realisations]
+
+                for lamb, w_lamb in zip(lambdas, poids):
+                    regression.w = w_lamb
+                    colonnes['erreur_entrainement'].append(regression.score(x_train, t_train, False).mean(axis=0))
+                    colonnes['erreur_test'].append(regression.score(x_test, t_test, False).mean(axis=0))
+
+                    for nom, valeur in (('nb_train', nb_train), ('bruit', bruit), ('M', m), ('lamb', lamb)):
+                        colonnes[nom].append(np.full(nb_realisations, valeur))
+                    colonnes['realisation'].append(np.arange(nb_realisations))
+
+    resultats = {nom: np.concatenate(valeurs) for nom, valeurs in colonnes.items()}
+    resultats['modele_gen'] = np.full(len(resultats['M']), modele_gen)
+    resultats['sur_apprentissage'], resultats['sous_apprentissage'] = diagnostic_apprentissage(
+        resultats['erreur_test'], resultats['erreur_entrainement'], resultats['bruit'])
+
+    return resultats
+
+
+def resume(resultats):
+    """
+    Affiche, pour chaque configuration, la moyenne et l'ecart-type des erreurs ainsi que la proportion
+    des realisations diagnostiquees en sur- ou en sous-apprentissage.
+    """
+    cles = np.stack([resultats['nb_train'], resultats['bruit'], resultats['M'], resultats['lamb']], axis=1)
+    configurations, inverse = np.unique(cles, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+
+    print("nb_train  bruit    M   lambda     err_train        err_test          sur    sous")
+    for i, (nb_train, bruit, m, lamb) in enumerate(configurations):
+        masque = inverse == i
+        err_train = resultats['erreur_entrainement'][masque]
+        err_test = resultats['erreur_test'][masque]
+        print("%8d  %5.2f  %3d  %7.1e  %.3f +- %.3f  %.3f +- %.3f  %5.1f%%  %5.1f%%"
+              % (nb_train, bruit, m, lamb, err_train.mean(), err_train.std(), err_test.mean(), err_test.std(),
+                 100 * resultats['sur_apprentissage'][masque].mean(),
+                 100 * resultats['sous_apprentissage'][masque].mean()))
+
+
+def liste(argument, type_valeur):
+    """
+    Convertit un argument de la forme "a,b,c" en liste de valeurs
+    """
+    return [type_valeur(valeur) for valeur in argument.split(',')]
+
+################################
+# Execution en tant que script
+#
+# tapper python3 experiences.py sin 20,50,100 100 0.1,0.3 1,3,10 0,0.001,0.1 1000 resultats.npz
+################################
+
+
+def main():
+
+    if len(sys.argv) < 9:
+        print("Usage: python experiences.py modele_gen nb_train nb_test bruit M lambda nb_realisations fichier\n")
+        print("\t modele_gen=lineaire, sin ou tanh")
+        print("\t nb_train: nombres de donnees d'entrainement, separes par des virgules")
+        print("\t nb_test: nombre de donnees de test")
+        print("\t bruit: amplitudes du bruit, separees par des virgules")
+        print("\t M: degrés du polynome (> 0), separes par des virgules")
+        print("\t lambda: valeurs de lambda (>= 0), separees par des virgules")
+        print("\t nb_realisations: nombre de realisations du bruit par configuration")
+        print("\t fichier: fichier .npz ou sont ecrits les resultats (une colonne par champ)\n")
+        print(" exemple: python3 experiences.py sin 20,50,100 100 0.1,0.3 1,3,10 0,0.001,0.1 1000 resultats.npz\n")
+        return
+
+    modele_gen = sys.argv[1]
+    liste_nb_train = liste(sys.argv[2], int)
+    nb_test = int(sys.argv[3])
+    bruits = liste(sys.argv[4], float)
+    degres = liste(sys.argv[5], int)
+    lambdas = liste(sys.argv[6], float)
+    nb_realisations = int(sys.argv[7])
+    fichier = sys.argv[8]
+
+    resultats = experience_monte_carlo(modele_gen, liste_nb_train, nb_test, bruits, degres, lambdas, nb_realisations)
+    np.savez_compressed(fichier, **resultats)
+
+    resume(resultats)
+    print("\nResultats ecrits dans", fichier)
+
+
+if __name__ == "__main__":
+    main()
@@ -40,24 +40,58 @@ class GestionDonnees:
 
         return x_train, t_train, x_test, t_test
 
-    def afficher_donnees_et_modele(self, x, t, scatter=True):
+    def generer_donnees_lot(self, nb_realisations):
+        """
+        Fonction qui genere ``nb_realisations`` realisations du bruit pour les memes donnees d'entree.
+
+        Les entrees x_train et x_test sont tirees une seule fois ; les cibles sont retournees sous forme
+        de matrices [nb_train, nb_realisations] et [nb_test, nb_realisations], une colonne par realisation.
+        Pour une meme valeur de nb_train, les entrees et le bruit (avant multiplication par self.bruit)
+        sont identiques d'un appel a l'autre.
+        """
+        np.random.seed(self.nb_train)
+        x_train = np.random.rand(self.nb_train)
+        x_test = np.random.rand(self.nb_test)
+        bruit_train = np.random.randn(self.nb_train, nb_realisations) * self.bruit
+        bruit_test = np.random.randn(self.nb_test, nb_realisations) * self.bruit
+
+        t_train = self.modele_sans_bruit(x_train)[:, None] + bruit_train
+        t_test = self.modele_sans_bruit(x_test)[:, None] + bruit_test
+
+        return x_train, t_train, x_test, t_test
+
+    def modele_sans_bruit(self, x):
+        """
+        Retourne les cibles du modele generatif (sans bruit) pour les entrees ``x``
+        """
+        if self.modele_gen == 'lineaire':
+            return self.w[0] + x * self.w[1]
+        elif self.modele_gen == 'sin':
+            return np.sin(x * self.w[1] * 2)
+        else:
+            return np.tanh((x - 0.5) * self.w[1] * 2)
+
+    def afficher_donnees_et_modele(self, x, t, scatter=True, mode='points', budget=5000, resolution=200):
         """
         afficher des donnees
 
         x : vecteur de donnees
         t : vecteur de cibles
         scatter : variable determinant si on doit afficher une courbe ou des points
+        mode : lorsque scatter est vrai, 'points' affiche toutes les donnees, 'sous_echantillon' au plus
+               ``budget`` donnees reparties uniformement selon x, et 'densite' un histogramme 2D de
+               ``resolution`` x ``resolution`` cases (utile pour des centaines de milliers de points)
         """
         x_mod = np.arange(0, 1, 0.01)
+        t_mod = self.modele_sans_bruit(x_mod)
 
-        if self.modele_gen == 'lineaire':
-            t_mod = self.w[0] + x_mod * self.w[1]
-        elif self.modele_gen == 'sin':
-            t_mod = np.sin(x_mod * self.w[1] * 2)
-        else:
-            t_mod = np.tanh((x_mod - 0.5) * self.w[1] * 2)
-
-        if scatter is True:
+        if scatter is True and mode == 'densite':
+            plt.hist2d(x, t, bins=resolution, range=[[np.min(x), np.max(x)], [-1.5, 4.5]], cmin=1)
+        elif scatter is True:
+            if mode == 'sous_echantillon' and len(x) > budget:
+                # Sous-echantillonage stratifie selon x : des donnees regulierement espacees dans l'ordre des x
+                idx = np.argsort(x)[np.linspace(0, len(x) - 1, budget).astype(int)]
+                x, t = x[idx], t[idx]
             plt.scatter(x, t)
         else:
             idx = np.argsort(x)
@@ -65,4 +99,3 @@ class GestionDonnees:
 
         plt.plot(x_mod, t_mod, 'k')
         plt.ylim(ymin=-1.5, ymax=4.5)
-
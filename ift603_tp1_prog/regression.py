@@ -22,32 +22,53 @@ def warning(erreur_test, erreur_apprentissage, bruit):
     erreur_apprentissage: erreur obtenue sur l'ensemble d'apprentissage
     bruit: magnitude du bruit
     """
-    if(erreur_apprentissage < bruit and erreur_test > (1+bruit) * erreur_apprentissage): 
-        # On vérifie que l'erreur d'entrainement est petite alors que l'erreur de test est grande
+    sur, sous = diagnostic_apprentissage(erreur_test, erreur_apprentissage, bruit)
+    if sur:
         print("SUR APPRENTISSAGE")
 
-    elif(erreur_apprentissage >= bruit and erreur_apprentissage >= bruit):
-        # On vérifie que les erreurs de tests et d'entrainement sont grandes.
+    elif sous:
         print("SOUS APPRENTISSAGE")
 
+
+def diagnostic_apprentissage(erreur_test, erreur_apprentissage, bruit):
+    """
+    Version vectorielle des criteres de ``warning`` : retourne deux tableaux booleens (sur, sous)
+    indiquant, pour chaque element de ``erreur_test`` et ``erreur_apprentissage``, une possibilite
+    de sur- ou de sous-apprentissage.
+    """
+    erreur_test = np.asarray(erreur_test)
+    erreur_apprentissage = np.asarray(erreur_apprentissage)
+
+    # On vérifie que l'erreur d'entrainement est petite alors que l'erreur de test est grande
+    sur = (erreur_apprentissage < bruit) & (erreur_test > (1+bruit) * erreur_apprentissage)
+
+    # On vérifie que les erreurs de tests et d'entrainement sont grandes.
+    sous = ~sur & (erreur_apprentissage >= bruit)
+
+    return sur, sous
+
 ################################
 # Execution en tant que script
 #
 # tapper python3 regression.py 1 sin 20 20 0.3 10 0.001
 ################################
 
+NB_POINTS_MAX = 20000
+
 
 def main():
 
     if len(sys.argv) < 8:
-        print("Usage: python regression.py sk modele_gen nb_train nb_test bruit M lambda\n")
+        print("Usage: python regression.py sk modele_gen nb_train nb_test bruit M lambda [cv] [fichier]\n")
         print("\t sk=0: using_sklearn=False, sk=1: using_sklearn=True")
         print("\t modele_gen=lineaire, sin ou tanh")
         print("\t nb_train: nombre de donnees d'entrainement")
         print("\t nb_test: nombre de donnees de test")
         print("\t bruit: amplitude du bruit appliqué aux données")
         print("\t M: degré du polynome de la fonction de base (recherche d'hyperparametre lorsque M<0) ")
-        print("\t lambda: lambda utilisé par le modele de Ridge\n")
+        print("\t lambda: lambda utilisé par le modele de Ridge (recherche conjointe (M, lambda) lorsque lambda<0)")
+        print("\t cv: critere de la recherche d'hyperparametres, kfold (defaut), loo ou gcv")
+        print("\t fichier: sauvegarde la figure dans ce fichier plutot que de l'afficher\n")
         print(" exemple: python3 regression.py 1 sin 20 20 0.3 10 0.001\n")
         return
 
@@ -58,6 +79,8 @@ def main():
     bruit = float(sys.argv[5])
     m = int(sys.argv[6])
     lamb = float(sys.argv[7])
+    cv = sys.argv[8] if len(sys.argv) > 8 else 'kfold'
+    fichier = sys.argv[9] if len(sys.argv) > 9 else None
     w = [0.3, 4.1]  # Parametres du modele generatif
 
     # Creer le gestionnaire de donnees et generer les donnees d'entraînement et de test
@@ -65,35 +88,36 @@ def main():
     [x_train, t_train, x_test, t_test] = gestionnaire_donnees.generer_donnees()
 
     # Entrainement du modele de regression
-    regression = sr.Regression(lamb, m)
+    regression = sr.Regression(lamb, m, cv)
     regression.entrainement(x_train, t_train, using_sklearn=skl)
 
-    # Predictions sur les ensembles d'entrainement et de test
-    predictions_train = np.array([regression.prediction(x) for x in x_train])
-    predictions_test = np.array([regression.prediction(x) for x in x_test])
-
-    # Calcul des erreurs
-    erreurs_entrainement = np.array([regression.erreur(t_n, p_n)
-                                     for t_n, p_n in zip(t_train, predictions_train)])
-    erreurs_test = np.array([regression.erreur(t_n, p_n)
-                             for t_n, p_n in zip(t_test, predictions_test)])
+    # Calcul des erreurs sur les ensembles d'entrainement et de test
+    erreur_entrainement = regression.score(x_train, t_train)
+    erreur_test = regression.score(x_test, t_test)
 
-    print("Erreur d'entraînement :", "%.2f" % erreurs_entrainement.mean())
-    print("Erreur de test :", "%.2f" % erreurs_test.mean())
+    print("Erreur d'entraînement :", "%.2f" % erreur_entrainement)
+    print("Erreur de test :", "%.2f" % erreur_test)
     print("")
 
-    warning(erreurs_test.mean(), erreurs_entrainement.mean(), bruit)
+    warning(erreur_test, erreur_entrainement, bruit)
 
     # Affichage
-    gestionnaire_donnees.afficher_donnees_et_modele(x_train, t_train, True)
-    predictions_range = np.array([regression.prediction(x) for x in np.arange(0, 1, 0.01)])
-    gestionnaire_donnees.afficher_donnees_et_modele(np.arange(0, 1, 0.01), predictions_range, False)
-
-    if m >= 0:
+    # Au-dela de NB_POINTS_MAX donnees, on affiche un histogramme 2D plutot que chaque point
+    mode = 'points' if nb_train <= NB_POINTS_MAX else 'densite'
+    gestionnaire_donnees.afficher_donnees_et_modele(x_train, t_train, True, mode=mode)
+    x_range = np.arange(0, 1, 0.01)
+    predictions_range = regression.predict_batch(x_range)
+    gestionnaire_donnees.afficher_donnees_et_modele(x_range, predictions_range, False)
+
+    if m > 0 and lamb >= 0:
         plt.suptitle('Resultat SANS recherche d\'hyperparametres')
     else:
         plt.suptitle('Resultat AVEC recherche d\'hyperparametres')
-    plt.show()
+
+    if fichier is None:
+        plt.show()
+    else:
+        plt.savefig(fichier)
 
 
 if __name__ == "__main__":
@@ -9,40 +9,144 @@
 import numpy as np
 from sklearn import linear_model
 from sklearn.model_selection import train_test_split
-from itertools import product
+from scipy.linalg import solve_triangular
+from itertools import product, combinations_with_replacement
+from functools import lru_cache
+from math import comb
+from solveur_lineaire import FactorisationCholesky
+
+
+@lru_cache(maxsize=None)
+def _plan_monomes(D, M):
+    """
+    Plan de construction des monomes de degre total 1 a M en D variables.
+
+    Retourne une liste de M paires (parents, variables) de tableaux d'indices : les colonnes de phi de
+    degre d sont phi[:, parents] * x[:, variables], ou ``parents`` designe des colonnes de degre d-1.
+    Le plan ne depend que de (D, M) ; il est garde en cache pour les appels suivants.
+    """
+    index = {(): 0}
+    plan = []
+    for d in range(1, M+1):
+        monomes = list(combinations_with_replacement(range(D), d))
+        parents = np.array([index[monome[:-1]] for monome in monomes], dtype=int)
+        variables = np.array([monome[-1] for monome in monomes], dtype=int)
+        for monome in monomes:
+            index[monome] = len(index)
+
+        parents.setflags(write=False)
+        variables.setflags(write=False)
+        plan.append((parents, variables))
+    return plan
 
 
 class Regression:
-    def __init__(self, lamb, m=1):
+    # Grille de lambda exploree lorsque lambda < 0 (recherche conjointe (M, lambda))
+    LAMBDAS_RECHERCHE = np.logspace(-9, 1, 21)
+
+    def __init__(self, lamb, m=1, cv='kfold'):
+        """
+        cv: critere de la recherche d'hyperparametres, 'kfold' (sous-echantillonage aleatoire 80:20),
+            'loo' (validation croisee leave-one-out exacte) ou 'gcv' (validation croisee generalisee)
+        """
+        if cv not in ('kfold', 'loo', 'gcv'):
+            raise ValueError(f"Critere de recherche d'hyperparametres inconnu : {cv}")
+
         self.lamb = lamb
         self.w = None
         self.M = m
         self.inter = 0
+        self.cv = cv
+        self.D = None  # dimension des entrees vues a l'entrainement (1 pour des entrees scalaires)
 
-    def fonction_base_polynomiale(self, x):
+        # Statistiques suffisantes phi^T phi, phi^T t, t^T t et nombre de donnees vues (voir partial_fit)
+        self.phi_phi = None
+        self.phi_t = None
+        self.t_t = None
+        self.n = 0
+
+        # Factorisation de phi^T phi + lambda*I et variance du bruit 1/beta (voir prediction_bayesienne)
+        self.facteur = None
+        self.variance_bruit = None
+
+    def fonction_base_polynomiale(self, x, out=None):
         """
         Fonction de base qui projette la donnee x vers un espace polynomial tel que mentionné au chapitre 3.
         --> Si x est un scalaire, alors phi_x sera un vecteur de longueur self.M + 1 (incluant le biais) :
         (1, x^1,x^2,...,x^self.M)
         --> Si x est un vecteur de N scalaires, alors phi_x sera un tableau 2D de taille [N,M+1] (incluant le biais)
+        --> Si x est un tableau 2D [N,D] (N entrees de dimension D), alors phi_x contient tous les monomes de
+        degre total <= self.M, ordonnes par degre : [N, C(D+M, M)] (voir ``nb_fonctions_base``)
+        --> Si le modele a ete entraine sur des entrees de dimension D > 1 (``self.D``), un tableau 1D de
+        longueur D est une seule entree et phi_x est alors un vecteur de longueur C(D+M, M)
 
-        NOTE : En mettant phi_x = x, on a une fonction de base lineaire qui fonctionne pour une regression lineaire
-        """
+        La matrice de Vandermonde est construite en une seule operation vectorielle : chaque colonne
+        est obtenue par produit cumulatif (x^i = x^(i-1) * x) plutot qu'en recalculant chaque puissance.
+        En dimension D, les monomes de degre d+1 sont obtenus en multipliant un monome de degre d deja
+        calcule par une des variables, selon un plan precalcule une seule fois par (D, M) (voir
+        ``_plan_monomes``).
 
-        if(type(x) == np.float64):  # on regarde si l'entree est un vecteur ou un scalaire
-            phi_x = np.array([np.power(x, i) for i in range(0, self.M+1)])
+        out : tableau optionnel de taille [N',nb_colonnes] avec N' >= N dans lequel ecrire le resultat.
+        Permet de traiter les donnees par blocs sans reallouer la matrice a chaque appel (la vue out[:N]
+        est alors retournee).
 
+        NOTE : En mettant phi_x = x, on a une fonction de base lineaire qui fonctionne pour une regression lineaire
+        """
+        x = np.asarray(x, dtype=float)
+        if self.D is not None and self.D > 1 and x.ndim == 1 and x.shape[0] == self.D:
+            x = x.reshape(1, -1)  # une seule entree multivariee
+            scalaire = True
         else:
-            phi_x = np.zeros(shape=[x.shape[0], self.M+1], dtype=float)
+            scalaire = x.ndim == 0  # on regarde si l'entree est un vecteur ou un scalaire
+        if self.D is not None and self.dimension(x) != self.D:
+            raise ValueError(f"Le modele attend des entrees de dimension {self.D}, recu un tableau de taille "
+                             f"{x.shape}")
+        multivariee = x.ndim == 2 and x.shape[1] > 1
+        x = x.reshape(x.shape[0], -1) if x.ndim == 2 else x.reshape(-1, 1)
+
+        nb_colonnes = self.nb_fonctions_base(x, self.M)
+        if out is None:
+            phi_x = np.empty(shape=[x.shape[0], nb_colonnes], dtype=float)
+        else:
+            phi_x = out[:x.shape[0]]
+
+        phi_x[:, 0] = 1.
+        if multivariee:
+            debut = 1
+            for parents, variables in _plan_monomes(x.shape[1], self.M):
+                fin = debut + len(parents)
+                np.multiply(phi_x[:, parents], x[:, variables], out=phi_x[:, debut:fin])
+                debut = fin
+
+        elif self.M > 0:
+            phi_x[:, 1:] = x
+            np.cumprod(phi_x[:, 1:], axis=1, out=phi_x[:, 1:])
+
+        if scalaire:
+            return phi_x[0]
+        return phi_x
 
-            for i, j in product(range(self.M+1), range(x.shape[0])):
-                phi_x[j, i] = np.power(x[j], i)
+    @staticmethod
+    def dimension(x):
+        """
+        Retourne la dimension D des entrees ``x`` : D pour un tableau [N, D], 1 pour des entrees scalaires.
+        """
+        return np.shape(x)[1] if np.ndim(x) == 2 else 1
 
-        return phi_x
+    @staticmethod
+    def nb_fonctions_base(x, m):
+        """
+        Retourne le nombre de colonnes de phi pour les entrees ``x`` et le degre ``m`` : m+1 pour des
+        entrees scalaires, C(D+m, m) pour des entrees [N, D]. Les colonnes d'un degre m inferieur sont
+        toujours les premieres colonnes de phi.
+        """
+        return comb(Regression.dimension(x) + m, m)
 
-    def recherche_hyperparametre(self, X, t, skl):
+    def recherche_hyperparametre(self, X, t, skl, cache_gram=True):
         """
         Trouver la meilleure valeur pour l'hyper-parametre self.M (pour un lambda fixe donné en entrée).
+        Lorsque self.lamb < 0, la recherche est conjointe sur (M, lambda), lambda parcourant
+        ``Regression.LAMBDAS_RECHERCHE``. Lorsque seul lambda est recherche (self.M > 0), M reste fixe.
 
         Option 1
         Validation croisée de type "k-fold" avec k=10. La méthode array_split de numpy peut être utlisée
@@ -55,33 +159,225 @@ class Regression:
 
         Note:
 
-        Le resultat est mis dans la variable self.M
+        Option 3 (self.cv = 'loo' ou 'gcv', sans sklearn)
+        Chaque candidat est evalue a partir d'un seul entrainement sur toutes les donnees, a l'aide de la
+        diagonale de la matrice chapeau (voir ``_erreurs_loo``).
+
+        Le resultat est mis dans la variable self.M (et self.lamb)
 
-        X: vecteur de donnees
+        X: vecteur de donnees (ou tableau [N, D] d'entrees multivariees)
         t: vecteur de cibles
+        cache_gram: lorsque vrai (et sans sklearn), les statistiques du degre maximal sont calculees une
+                    seule fois par separation et les degres inferieurs en sont extraits
+                    (voir ``_erreurs_degres_imbriques`` et ``_erreurs_chemin``)
         """
-        meilleur_err = np.inf
-        meilleur_param = -1
+        self.D = self.dimension(X)
+        degres = range(1, 25) if self.M <= 0 else [self.M]  # On teste plusieurs degrés du polynôme
+        if np.ndim(X) == 2 and np.shape(X)[1] > 1:
+            # En dimension D > 1, le nombre de monomes croit en C(D+M, M) : on s'arrete au degre ou il
+            # depasse le nombre de donnees
+            degres = [m for m in degres if m == degres[0] or self.nb_fonctions_base(X, m) <= len(X)]
+        lambdas = self.LAMBDAS_RECHERCHE if self.lamb < 0 else np.array([self.lamb])
         num_fold = 10
-        for hyper in range(1, 25):  # On teste plusieurs degrés du polynôme
-            self.M = hyper
-            sum_error = 0
-
-            for k in range(num_fold):  # K-fold validation (Option 2)
-                # random_state=k pour avoir les mêmes echantillons de données à chaque M différent testé.
-                # Le professeur nous a autorisé à utiliser la fonction train_test_split ci-dessous.
-                X_train, X_val, y_train, y_val = train_test_split(X, t, test_size=0.2, random_state=k, shuffle=True)
-                self.entrainement(X_train, y_train, using_sklearn=skl)
-                y_hat = self.prediction(X_val)  # vecteur de prédiction
-                sum_error += np.sum(self.erreur(y_val, y_hat))
-
-            avg_err_locale = sum_error/(num_fold)  # On regarde la moyenne des erreurs sur le K-fold  
-            if(avg_err_locale < meilleur_err):
-                meilleur_err = avg_err_locale
-                meilleur_param = hyper
-
-        self.M = meilleur_param
+
+        if self.cv in ('loo', 'gcv') and not skl:
+            erreurs = self._erreurs_loo(X, t, degres, lambdas)
+
+        elif cache_gram and not skl and len(lambdas) == 1:
+            erreurs = self._erreurs_degres_imbriques(X, t, degres, num_fold)[:, None]
+
+        elif cache_gram and not skl:
+            erreurs = self._erreurs_chemin(X, t, degres, lambdas, num_fold)
+
+        else:
+            erreurs = np.zeros((len(degres), len(lambdas)))
+            for (i, hyper), (j, lamb) in product(enumerate(degres), enumerate(lambdas)):
+                self.M = hyper
+                self.lamb = lamb
+                sum_error = 0
+
+                for k in range(num_fold):  # K-fold validation (Option 2)
+                    # random_state=k pour avoir les mêmes echantillons de données à chaque M différent testé.
+                    # Le professeur nous a autorisé à utiliser la fonction train_test_split ci-dessous.
+                    X_train, X_val, y_train, y_val = train_test_split(X, t, test_size=0.2, random_state=k,
+                                                                      shuffle=True)
+                    self.entrainement(X_train, y_train, using_sklearn=skl)
+                    y_hat = self.prediction(X_val)  # vecteur de prédiction
+                    sum_error += np.sum(self.erreur(y_val, y_hat))
+
+                erreurs[i, j] = sum_error/(num_fold)  # On regarde la moyenne des erreurs sur le K-fold
+
+        i, j = np.unravel_index(np.argmin(erreurs), erreurs.shape)
+        self.M = degres[i]
+        self.lamb = lambdas[j]
         print(f"Meilleur paramètre choisi = {self.M}")
+        if len(lambdas) > 1:
+            print(f"Meilleur lambda choisi = {self.lamb:g}")
+
+    def chemin_regularisation(self, X, t, lambdas, X_val=None, t_val=None):
+        """
+        Calcule les poids de la regression pour toute une grille de valeurs de lambda a partir d'une seule
+        decomposition en valeurs singulieres phi = U diag(s) V^T :
+
+            w(lambda) = V diag(s / (s^2 + lambda)) U^T t
+
+        Seul le filtre diag(s / (s^2 + lambda)) depend de lambda, chaque lambda supplementaire ne coute
+        donc qu'un produit matrice-vecteur.
+
+        X, t: donnees et cibles d'entrainement
+        lambdas: tableau 1D de L valeurs de lambda
+        X_val, t_val: donnees de validation optionnelles
+
+        Retourne le tableau [L, M+1] des poids ([L, M+1, K] si t est une matrice [N, K] de cibles) et, si
+        X_val et t_val sont donnes, le tableau [L] de la somme des erreurs de validation pour chaque lambda.
+        """
+        self.D = self.dimension(X)
+        phi_x = self.fonction_base_polynomiale(X)
+        poids = self._poids_chemin(phi_x, t, lambdas)
+
+        if X_val is None:
+            return poids
+
+        y_hat = np.einsum('nm,lm...->nl...', self.fonction_base_polynomiale(X_val), poids)  # [N_val, L(, K)]
+        return poids, self._par_lambda(self.erreur(np.expand_dims(t_val, 1), y_hat))
+
+    @staticmethod
+    def _poids_chemin(phi_x, t, lambdas):
+        """
+        Poids de la regression ridge [L, M+1] pour chaque valeur de ``lambdas`` (voir
+        ``chemin_regularisation``).
+        """
+        U, s, Vt = np.linalg.svd(phi_x, full_matrices=False)
+        denominateur = np.square(s) + np.reshape(lambdas, (-1, 1))
+        filtres = np.divide(s, denominateur, out=np.zeros_like(denominateur), where=denominateur > 0)
+        return np.einsum('lr,r...,rm->lm...', filtres, np.dot(U.T, t), Vt)
+
+    @staticmethod
+    def _par_lambda(erreurs, reduction=np.sum):
+        """
+        Reduit un tableau d'erreurs [N, L] (ou [N, L, K] avec K cibles) en un tableau [L] par valeur de
+        lambda, a l'aide de ``reduction`` appliquee sur les donnees et les cibles.
+        """
+        return reduction(np.reshape(np.moveaxis(erreurs, 1, 0), (erreurs.shape[1], -1)), axis=1)
+
+    def _erreurs_chemin(self, X, t, degres, lambdas, num_fold):
+        """
+        Erreurs de validation moyennes [len(degres), len(lambdas)] pour la recherche conjointe (M, lambda).
+
+        Comme pour ``_erreurs_degres_imbriques``, la base du degre maximal n'est construite qu'une fois
+        par separation ; pour chaque degre, une seule SVD du bloc de tete donne les erreurs de toute la
+        grille de lambda (voir ``chemin_regularisation``).
+        """
+        m_max = max(degres)
+        sum_error = np.zeros((len(degres), len(lambdas)))
+        self.M = m_max
+
+        for k in range(num_fold):
+            X_train, X_val, y_train, y_val = train_test_split(X, t, test_size=0.2, random_state=k, shuffle=True)
+            phi_train = self.fonction_base_polynomiale(X_train)
+            phi_val = self.fonction_base_polynomiale(X_val)
+
+            for i, m in enumerate(degres):
+                nb_colonnes = self.nb_fonctions_base(X, m)
+                poids = self._poids_chemin(phi_train[:, :nb_colonnes], y_train, lambdas)
+                y_hat = np.einsum('nm,lm...->nl...', phi_val[:, :nb_colonnes], poids)
+                sum_error[i] += self._par_lambda(self.erreur(np.expand_dims(y_val, 1), y_hat))
+
+        return sum_error/num_fold
+
+    def _erreurs_degres_imbriques(self, X, t, degres, num_fold):
+        """
+        Calcule l'erreur de validation moyenne pour chaque degre de ``degres`` sans reconstruire phi
+        pour chaque degre.
+
+        Les bases polynomiales sont imbriquees : la matrice de Gram phi^T phi + lambda*I et le vecteur
+        phi^T t du degre M sont les blocs en tete de ceux du degre maximal. On les calcule donc une seule
+        fois par separation, puis la factorisation de Cholesky est agrandie d'une rangee a chaque degre
+        (au lieu d'etre refaite au complet). Si un pivot devient negatif, chaque degre restant est resolu
+        avec ``FactorisationCholesky``, qui ajoute un petit terme a la diagonale.
+
+        Retourne un tableau 1D des erreurs moyennes, dans l'ordre de ``degres``.
+        """
+        m_max = max(degres)
+        sum_error = np.zeros(len(degres))
+        self.M = m_max
+
+        # Nombre de colonnes de phi pour chaque degre teste (M+1 pour des entrees scalaires)
+        fins = {self.nb_fonctions_base(X, m): i for i, m in enumerate(degres)}
+
+        for k in range(num_fold):
+            X_train, X_val, y_train, y_val = train_test_split(X, t, test_size=0.2, random_state=k, shuffle=True)
+            phi_train = self.fonction_base_polynomiale(X_train)
+            phi_val = self.fonction_base_polynomiale(X_val)
+
+            nb_colonnes = phi_train.shape[1]
+            gram = np.dot(phi_train.T, phi_train) + self.lamb * np.identity(nb_colonnes)
+            phi_t = np.dot(phi_train.T, y_train)
+
+            L = np.zeros((nb_colonnes, nb_colonnes))
+            cholesky_valide = True
+            for c in range(nb_colonnes):
+                if cholesky_valide:
+                    # Nouvelle rangee du facteur : L[c, :c] = L_c^-1 gram[:c, c]
+                    l_c = solve_triangular(L[:c, :c], gram[:c, c], lower=True)
+                    pivot = gram[c, c] - np.dot(l_c, l_c)
+                    if pivot > 0:
+                        L[c, :c] = l_c
+                        L[c, c] = np.sqrt(pivot)
+                    else:
+                        # Matrice numeriquement non definie positive (lambda trop petit)
+                        cholesky_valide = False
+
+                if c+1 not in fins:
+                    continue
+
+                if cholesky_valide:
+                    z = solve_triangular(L[:c+1, :c+1], phi_t[:c+1], lower=True)
+                    w = solve_triangular(L[:c+1, :c+1].T, z, lower=False)
+                else:
+                    w = FactorisationCholesky(gram[:c+1, :c+1]).resoudre(phi_t[:c+1])
+
+                y_hat = np.dot(phi_val[:, :c+1], w)
+                sum_error[fins[c+1]] += np.sum(self.erreur(y_val, y_hat))
+
+        return sum_error/num_fold
+
+    def _erreurs_loo(self, X, t, degres, lambdas):
+        """
+        Erreurs [len(degres), len(lambdas)] obtenues sans re-entrainement, selon le critere self.cv.
+
+        Avec phi = U diag(s) V^T, les predictions de la regression ridge sont y = H t avec la matrice
+        chapeau H = U diag(s^2 / (s^2 + lambda)) U^T. On a alors exactement :
+
+        'loo' : moyenne de ((t_n - y_n) / (1 - H_nn))^2 (erreur leave-one-out)
+        'gcv' : moyenne de (t_n - y_n)^2 / (1 - trace(H)/N)^2
+
+        Une SVD par degre suffit pour toute la grille de lambda.
+        """
+        self.M = max(degres)
+        phi_x = self.fonction_base_polynomiale(X)
+        erreurs = np.zeros((len(degres), len(lambdas)))
+
+        for i, m in enumerate(degres):
+            U, s, _ = np.linalg.svd(phi_x[:, :self.nb_fonctions_base(X, m)], full_matrices=False)
+            denominateur = np.square(s) + np.reshape(lambdas, (-1, 1))
+            filtres = np.divide(np.square(s), denominateur, out=np.zeros_like(denominateur),
+                                where=denominateur > 0)  # [L, r]
+
+            y_hat = np.einsum('nr,lr,r...->nl...', U, filtres, np.dot(U.T, t))  # [N, L(, K)]
+            residus = np.expand_dims(t, 1) - y_hat
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if self.cv == 'loo':
+                    levier = np.dot(np.square(U), filtres.T)  # diagonale de H, [N, L]
+                    levier = np.reshape(levier, levier.shape + (1,) * (residus.ndim - 2))
+                    erreurs[i] = self._par_lambda(np.square(residus / (1 - levier)), np.mean)
+                else:
+                    ddl = np.sum(filtres, axis=1)  # trace(H), [L]
+                    erreurs[i] = self._par_lambda(np.square(residus), np.mean) / np.square(1 - ddl/len(t))
+
+        # Un levier de 1 (interpolation exacte) rend le critere infini
+        return np.where(np.isnan(erreurs), np.inf, erreurs)
 
     def entrainement(self, X, t, using_sklearn=False):
         """
@@ -106,31 +402,114 @@ class Regression:
         Aussi, la variable membre self.M sert à projeter les variables X vers un espace polynomiale de degre M
         (voir fonction self.fonction_base_polynomiale())
 
+        Les cibles ``t`` peuvent aussi former une matrice [N, K] (par exemple K realisations du
+        bruit pour les memes entrees) : les K vecteurs de poids sont alors obtenus avec une seule
+        construction de phi et une seule factorisation, et ``self.w`` est de taille [M+1, K].
+
         NOTE IMPORTANTE : lorsque self.M <= 0, il faut trouver la bonne valeur de self.M
+        (et de self.lamb lorsque self.lamb < 0)
 
         """
-        if self.M <= 0:  # On regarde s'il faut faire la recherche d'hyperparamètre
+        self.D = self.dimension(X)
+        if self.M <= 0 or self.lamb < 0:  # On regarde s'il faut faire la recherche d'hyperparamètre
             self.recherche_hyperparametre(X, t, using_sklearn)
 
         phi_x = self.fonction_base_polynomiale(X)
 
         if(not using_sklearn):
             # Calculs basé sur le livre Bishop
-            a = np.dot(self.lamb, np.identity(self.M+1))
-            b = np.dot(phi_x.T, phi_x)
-            inv_c = np.linalg.solve(a+b, np.eye((a+b).shape[0]))
-            d = np.dot(phi_x.T, t)
-            self.w = np.dot(inv_c, d)
+            # On garde les statistiques pour pouvoir poursuivre l'entrainement avec partial_fit
+            self.phi_phi = np.dot(phi_x.T, phi_x)
+            self.phi_t = np.dot(phi_x.T, t)
+            self.t_t = np.sum(np.square(t), axis=0)
+            self.n = phi_x.shape[0]
+            self._resoudre_statistiques()
 
         else:
+            self.phi_phi, self.phi_t, self.t_t, self.n = None, None, None, 0
+            self.facteur, self.variance_bruit = None, None
+
             # Calculs basé sur scikit-learn.org
             reg = linear_model.Ridge(alpha=self.lamb)
             reg.fit(phi_x, t)
-            self.w = reg.coef_
+            self.w = reg.coef_.T.copy()  # [M+1] ou [M+1, K]
             # Le premier coefficient de reg.coef_ est toujours égal à 0.
             # On le remplace par reg.intercept_
             self.w[0] = reg.intercept_
 
+    def partial_fit(self, x_chunk, t_chunk):
+        """
+        Poursuit l'entrainement (sans sklearn) avec un nouveau bloc de donnees ``x_chunk`` et de cibles
+        ``t_chunk``, sans reprendre les donnees deja vues.
+
+        Les statistiques suffisantes phi^T phi et phi^T t sont mises a jour en O(N_bloc * M^2), puis
+        ``self.w`` est recalcule a partir de celles-ci (equation 3.28). Le resultat est identique a un
+        appel a ``entrainement()`` sur l'ensemble des blocs recus.
+
+        self.M et self.lamb doivent etre fixes (aucune recherche d'hyperparametre n'est faite).
+        """
+        if self.M <= 0 or self.lamb < 0:
+            raise ValueError("partial_fit demande des valeurs fixes de M (> 0) et de lambda (>= 0)")
+
+        if self.phi_phi is None:
+            self.D = self.dimension(np.atleast_1d(x_chunk))
+        phi_x = self.fonction_base_polynomiale(np.atleast_1d(x_chunk))
+        t_chunk = np.atleast_1d(np.asarray(t_chunk, dtype=float))  # une seule donnee : t est un scalaire
+        if self.phi_phi is None:
+            self.phi_phi = np.zeros((phi_x.shape[1], phi_x.shape[1]))
+            self.phi_t = np.zeros((phi_x.shape[1],) + np.shape(t_chunk)[1:])
+            self.t_t = np.zeros(np.shape(t_chunk)[1:])
+            self.n = 0
+
+        self.phi_phi += np.dot(phi_x.T, phi_x)
+        self.phi_t += np.dot(phi_x.T, t_chunk)
+        self.t_t += np.sum(np.square(t_chunk), axis=0)
+        self.n += phi_x.shape[0]
+        self._resoudre_statistiques()
+
+    def merge(self, other):
+        """
+        Ajoute les statistiques suffisantes d'un autre modele ``other`` (entraine avec ``partial_fit``
+        sur d'autres donnees, par exemple dans un autre processus) a celles de ce modele et recalcule
+        ``self.w``. Les deux modeles doivent avoir le meme degre M.
+
+        Un modele entraine avec sklearn ne garde pas de statistiques suffisantes et ne peut pas etre
+        fusionne.
+        """
+        if other.phi_phi is None and other.w is not None:
+            raise ValueError("Impossible de fusionner un modele sans statistiques suffisantes (entraine avec sklearn)")
+        if other.n == 0:
+            return
+        if other.M != self.M or (self.phi_phi is not None and self.phi_phi.shape != other.phi_phi.shape):
+            raise ValueError(f"Impossible de fusionner des modeles de degres differents ({self.M} et {other.M})")
+
+        if self.phi_phi is None:
+            self.D = other.D
+            self.phi_phi = np.zeros_like(other.phi_phi)
+            self.phi_t = np.zeros_like(other.phi_t)
+            self.t_t = np.zeros_like(other.t_t)
+            self.n = 0
+
+        self.phi_phi += other.phi_phi
+        self.phi_t += other.phi_t
+        self.t_t += other.t_t
+        self.n += other.n
+        self._resoudre_statistiques()
+
+    def _resoudre_statistiques(self):
+        """
+        Calcule ``self.w`` a partir des statistiques suffisantes accumulees. La factorisation de
+        phi^T phi + lambda*I est gardee dans ``self.facteur`` et la variance du bruit 1/beta (somme des
+        residus au carre divisee par N, equation 3.21) dans ``self.variance_bruit``.
+        """
+        self.facteur = FactorisationCholesky(self.phi_phi + self.lamb * np.identity(self.phi_phi.shape[0]))
+        self.w = self.facteur.resoudre(self.phi_t)
+
+        # ||t - phi w||^2 = t^T t - 2 w^T phi^T t + w^T phi^T phi w
+        residus = self.t_t - 2 * np.sum(self.w * self.phi_t, axis=0) + np.sum(self.w * np.dot(self.phi_phi, self.w),
+                                                                               axis=0)
+        self.variance_bruit = np.maximum(residus, 0) / self.n
+
     def prediction(self, x):
         """
         Retourne la prediction de la regression lineaire
@@ -142,7 +521,91 @@ class Regression:
         """
 
         fct = self.fonction_base_polynomiale(x)
-        return np.dot(self.w, fct.T)
+        return np.dot(fct, self.w)
+
+    def predict_batch(self, X, out=None):
+        """
+        Retourne le tableau 1D des predictions pour toutes les entrees de ``X``
+        (un tableau 1D Numpy de N scalaires), ou [N, K] lorsque le modele a ete
+        entraine sur K vecteurs de cibles. Pour des entrees scalaires, le polynome est evalue par la methode
+        de Horner (voir ``evaluation_horner``), sans construire la matrice phi.
+
+        Pour un modele entraine sur des entrees de dimension D > 1, ``X`` est un tableau [N, D] (ou une
+        seule entree de longueur D) et la prediction passe toujours par phi.
+
+        out : tableau optionnel de taille N dans lequel ecrire les predictions
+        """
+        X = self.entrees_lot(X)
+        if X.ndim == 2:  # entrees multivariees : on passe par phi
+            return np.dot(self.fonction_base_polynomiale(X), self.w, out=out)
+        return self.evaluation_horner(X, out=out)
+
+    def entrees_lot(self, X):
+        """
+        Retourne ``X`` sous la forme d'un lot d'entrees : un tableau 1D de N scalaires, ou un tableau
+        [N, D] lorsque le modele a ete entraine sur des entrees de dimension D > 1.
+        """
+        if self.D is not None and self.D > 1:
+            return np.atleast_2d(X)
+        return np.atleast_1d(X)
+
+    def evaluation_horner(self, x, out=None):
+        """
+        Evalue le polynome y(x) = w_0 + w_1 x + ... + w_M x^M avec la methode de Horner :
+
+            y = (...((w_M x + w_(M-1)) x + w_(M-2)) x + ...) x + w_0
+
+        Contrairement a ``np.dot(phi_x, self.w)``, la matrice [N, M+1] n'est jamais construite :
+        la memoire utilisee est celle de la sortie (N valeurs), qui peut etre fournie dans ``out``.
+        """
+        x = np.asarray(x, dtype=float)
+        if self.w.ndim > 1:  # plusieurs cibles : une colonne de sortie par vecteur de poids
+            x = np.reshape(x, x.shape + (1,))
+        if out is None:
+            out = np.empty(np.broadcast_shapes(x.shape, self.w.shape[1:]))
+
+        out[...] = self.w[-1]
+        for w_i in self.w[-2::-1]:
+            np.multiply(out, x, out=out)
+            out += w_i
+        return out
+
+    def score(self, X, t, moyenne=True):
+        """
+        Retourne l'erreur au carre entre les cibles ``t`` et les predictions du modele
+        pour les entrees ``X`` : la moyenne des erreurs lorsque ``moyenne`` est vrai,
+        sinon le tableau 1D des erreurs de chaque donnee.
+        """
+        erreurs = self.erreur(t, self.predict_batch(X))
+        if moyenne:
+            return np.mean(erreurs)
+        return erreurs
+
+    def prediction_bayesienne(self, X):
+        """
+        Retourne la moyenne et la variance de la distribution predictive (section 3.3.2 du livre de
+        Bishop) pour toutes les entrees de ``X`` :
+
+            moyenne(x) = w^T phi(x)
+            variance(x) = 1/beta + phi(x)^T S_N phi(x)
+
+        Avec lambda = alpha/beta, S_N = (1/beta) (phi^T phi + lambda*I)^-1 = (1/beta) (L L^T)^-1, ou L est
+        le facteur de Cholesky garde par ``entrainement()``. La variance de toutes les entrees s'obtient donc
+        avec une seule resolution triangulaire : variance(x) = 1/beta (1 + ||L^-1 phi(x)||^2).
+
+        Cette methode suppose que ``entrainement()`` (sans sklearn) ou ``partial_fit()`` a prealablement
+        ete appelee. Avec K vecteurs de cibles, la moyenne et la variance sont de taille [N, K].
+        """
+        if self.facteur is None:
+            raise ValueError("prediction_bayesienne demande un modele entraine sans sklearn")
+
+        phi_x = self.fonction_base_polynomiale(self.entrees_lot(X))
+        v = self.facteur.resoudre_triangulaire(phi_x.T)  # L^-1 phi^T, [M+1, N]
+        facteur_variance = 1 + np.sum(np.square(v), axis=0)
+
+        moyenne = np.dot(phi_x, self.w)
+        variance = np.multiply.outer(facteur_variance, self.variance_bruit)
+        return moyenne, variance
 
     @staticmethod
     def erreur(t, prediction):
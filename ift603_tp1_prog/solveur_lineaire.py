@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+#####
+#  Eliott THOMAS — 21 164 874
+#  Lilian FAVRE GARCIA — 21 153 421
+#  Tsiory Razafindramisa — 21 145 627
+###
+
+import numpy as np
+from scipy.linalg import cho_solve, lu_factor, lu_solve, solve_triangular
+
+
+class FactorisationCholesky:
+    def __init__(self, A, jitter=1e-10, essais_max=6):
+        """
+        Factorise une fois pour toutes la matrice symetrique ``A`` (de taille n x n) afin de resoudre
+        A x = b pour un ou plusieurs membres de droite, sans jamais calculer A^-1.
+
+        Lorsque A n'est pas numeriquement definie positive, un petit terme ``jitter`` (relatif a la
+        moyenne de la diagonale de A) est ajoute a la diagonale, et multiplie par 10 a chaque echec,
+        au plus ``essais_max`` fois. Si la factorisation de Cholesky echoue encore (matrice indefinie,
+        par exemple un noyau sigmoidal), on se rabat sur une factorisation LU.
+
+        Apres construction :
+        - ``self.L`` est le facteur triangulaire inferieur (A + jitter*I = L L^T), ou None si LU est utilise
+        - ``self.jitter`` est le terme effectivement ajoute a la diagonale
+        """
+        A = np.asarray(A, dtype=float)
+        self.L = None
+        self.lu = None
+        self.jitter = 0.
+
+        echelle = max(np.mean(np.abs(np.diag(A))), np.finfo(float).tiny)
+        for essai in range(essais_max + 1):
+            try:
+                self.L = np.linalg.cholesky(A + self.jitter * np.identity(A.shape[0]))
+                return
+            except np.linalg.LinAlgError:
+                self.jitter = jitter * echelle * 10**essai
+
+        self.jitter = 0.
+        self.lu = lu_factor(A)
+
+    def resoudre(self, b):
+        """
+        Retourne x tel que A x = b. ``b`` peut etre un vecteur ou une matrice (un membre de droite
+        par colonne) ; le facteur est reutilise pour tous les membres de droite.
+        """
+        if self.L is None:
+            return lu_solve(self.lu, b)
+        return cho_solve((self.L, True), b)
+
+    def resoudre_triangulaire(self, b):
+        """
+        Retourne L^-1 b (une seule resolution triangulaire). Par exemple, ||L^-1 b||^2 = b^T A^-1 b.
+        """
+        if self.L is None:
+            raise np.linalg.LinAlgError("La matrice n'est pas definie positive : aucun facteur de Cholesky")
+        return solve_triangular(self.L, b, lower=True)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-import numpy as np
 import sys
 import solution_classifieur_lineaire as solution
 import gestion_donnees as gd
@@ -13,17 +12,21 @@ import gestion_donnees as gd
 #
 #################################################
 
+NB_POINTS_MAX = 20000
+
 
 def main():
 
     if len(sys.argv) < 7:
-        usage = "\n Usage: python classifieur.py method nb_train nb_test lambda bruit corruption don_ab\
+        usage = "\n Usage: python classifieur.py method nb_train nb_test lambda bruit corruption don_ab [fichier]\
         \n\n\t method : 1 => Classification generative\
         \n\t method : 2 => Perceptron + SDG \n\t method : 3 => Perceptron + SDG [sklearn]\
+        \n\t method : 4 => Regression logistique + IRLS\
         \n\t nb_train, nb_test : nombre de donnees d'entrainement et de test\
         \n\t lambda >=0\
         \n\t bruit : multiplicateur de la matrice de variance-covariance (entre 0.1 et 50)\
         \n\t don_ab : production ou non de données aberrantes (0 ou 1) \
+        \n\t fichier : sauvegarde les figures dans ce fichier plutot que de les afficher (optionnel) \
         \n\n\t ex : python classifieur_lineaire.py 1 280 280 0.001 1 1"
         print(usage)
         return
@@ -34,6 +37,7 @@ def main():
     lamb = float(sys.argv[4])
     bruit = float(sys.argv[5])
     donnees_aberrantes = bool(int(sys.argv[6]))
+    fichier = sys.argv[7] if len(sys.argv) > 7 else None
 
     print("Generation des données d'entrainement...")
 
@@ -46,14 +50,16 @@ def main():
     classifieur.entrainement(x_train, t_train)
 
     # Prédictions sur les ensembles d'entraînement et de test
-    predictions_entrainement = np.array([classifieur.prediction(x) for x in x_train])
-    print("Erreur d'entrainement = ", 100*np.sum(np.abs(predictions_entrainement-t_train))/len(t_train), "%")
+    predictions_entrainement = classifieur.predict_batch(x_train)
+    print("Erreur d'entrainement = ", 100*classifieur.taux_erreur(t_train, predictions_entrainement), "%")
 
-    predictions_test = np.array([classifieur.prediction(x) for x in x_test])
-    print("Erreur de test = ", 100*np.sum(np.abs(predictions_test-t_test))/len(t_test), "%")
+    predictions_test = classifieur.predict_batch(x_test)
+    print("Erreur de test = ", 100*classifieur.taux_erreur(t_test, predictions_test), "%")
 
     # Affichage
-    classifieur.afficher_donnees_et_modele(x_train, t_train, x_test, t_test)
+    # Au-dela de NB_POINTS_MAX donnees, on affiche une image de densite plutot que chaque point
+    mode = 'points' if max(nb_train, nb_test) <= NB_POINTS_MAX else 'densite'
+    classifieur.afficher_donnees_et_modele(x_train, t_train, x_test, t_test, mode=mode, fichier=fichier)
 
 if __name__ == "__main__":
     main()
@@ -8,12 +8,15 @@
 
 import numpy as np
 from sklearn.linear_model import Perceptron
+from scipy.special import expit
 import matplotlib.pyplot as plt
-from itertools import product
+import os
+from solveur_lineaire import FactorisationCholesky
 
 
 class ClassifieurLineaire:
-    def __init__(self, lamb, methode):
+    def __init__(self, lamb, methode, taille_lot=32, nb_epoques_max=1000, patience=10, covariance='pleine',
+                 rang=2, random_state=42):
         """
         Algorithmes de classification lineaire
 
@@ -23,11 +26,33 @@ class ClassifieurLineaire:
         ``methode`` :   1 pour classification generative
                         2 pour Perceptron
                         3 pour Perceptron sklearn
+                        4 pour regression logistique (IRLS)
+
+        ``taille_lot``, ``nb_epoques_max`` et ``patience`` : paramètres du
+        perceptron par mini-lots (methode 2, voir ``perceptron_lots``)
+
+        ``covariance`` : structure de la matrice de covariance de la classification
+                        generative (methode 1) : 'pleine' (D x D), 'diagonale', ou
+                        'faible_rang' (diagonale + rang ``rang``, voir
+                        ``parametres_faible_rang``)
+
+        ``random_state`` : germe du générateur aléatoire local de l'itération de
+                        sous-espace (covariance 'faible_rang')
         """
         self.w = np.array([1., 2.])  # paramètre aléatoire
         self.w_0 = -5.              # paramètre aléatoire
         self.lamb = lamb
         self.methode = methode
+        self.taille_lot = taille_lot
+        self.nb_epoques_max = nb_epoques_max
+        self.patience = patience
+        self.covariance = covariance
+        self.rang = rang
+        self.random_state = random_state
+
+        # Moments (N, mu, S) des classes C1 (t=1) et C2 (t=0) pour la classification generative
+        # (voir partial_fit et merge)
+        self.moments = None
 
     def entrainement(self, x_train, t_train):
         """
@@ -60,51 +85,39 @@ class ClassifieurLineaire:
 
         lorsque method = 2 : Implementer l'algorithme de descente de gradient
                         stochastique du perceptron avec 1000 iterations
+                        (par mini-lots, avec arrêt anticipé, voir ``perceptron_lots``)
 
         lorsque method = 3 : utiliser la librairie sklearn pour effectuer une
                         classification binaire à l'aide du perceptron
 
+        lorsque method = 4 : régression logistique régularisée par ``self.lamb``,
+                        entraînée par la méthode de Newton (IRLS, voir
+                        ``regression_logistique_irls``)
+
         """
         if self.methode == 1:  # Classification generative
             print('Classification generative')
 
-            N1 = np.count_nonzero(t_train == 1)
-            N2 = np.count_nonzero(t_train == 0)
-
-            p = N1/(N1+N2)
-
-            elementsC1 = x_train[np.where(t_train == 1)]
-            elementsC2 = x_train[np.where(t_train == 0)]
-
-            # Moyennes
-            mu_1 = (1/N1) * np.sum(elementsC1, axis=0)
-            mu_2 = (1/N2) * np.sum(elementsC2, axis=0)
+            if self.covariance == 'faible_rang':
+                self.moments = None
+                self.parametres_faible_rang(x_train, t_train)
 
-            cols1 = [np.reshape(elementsC1[k] - mu_1, (-1, 1)) for k in range(len(elementsC1))]
-            cols2 = [np.reshape(elementsC2[k] - mu_2, (-1, 1)) for k in range(len(elementsC2))]
-
-            intermediate1 = np.array([np.dot(cols1[k], cols1[k].T) for k in range(len(cols1))])
-            intermediate2 = np.array([np.dot(cols2[k], cols2[k].T) for k in range(len(cols2))])
-
-            S1 = (1/N1) * np.sum(intermediate1, axis=0)
-            S2 = (1/N2) * np.sum(intermediate2, axis=0)
-
-            S = p*S1 + (1-p)*S2
-            S += np.identity(intermediate1.shape[1]) * self.lamb  # ne pas oublier la diagonale
-
-            inv_S = np.linalg.solve(S, np.eye((S).shape[0]))
-
-            self.w = inv_S.dot(mu_1 - mu_2)
-            self.w_0 = -0.5*(mu_1.T)@inv_S@mu_1 + 0.5*(mu_2.T)@inv_S@mu_2 + np.log(N1/N2)
+            else:
+                # Nombres de donnees, moyennes et covariances de chaque classe
+                diagonale = self._covariance_diagonale()
+                self.moments = [self.moments_classe(x_train[t_train == 1], diagonale),
+                                self.moments_classe(x_train[t_train == 0], diagonale)]
+                self.parametres_generatifs()
 
         elif self.methode == 2:  # Perceptron + SGD, learning rate = 0.001, nb_iterations_max = 1000
             print('Perceptron')
-            eta = 0.001
-            for iteration, (x_i, t_i) in product(range(1000), zip(x_train, t_train)):
-                score = self.prediction(x_i)
-                error = t_i - score
-                self.w_0 += error * eta
-                self.w += error * eta * x_i
+            nb_epoques = self.perceptron_lots(x_train, t_train, eta=0.001)
+            print('Nombre d\'epoques = ', nb_epoques)
+
+        elif self.methode == 4:  # Regression logistique + IRLS
+            print('Regression logistique [IRLS]')
+            nb_iterations = self.regression_logistique_irls(x_train, t_train)
+            print('Nombre d\'iterations = ', nb_iterations)
 
         else:  # Perceptron + SGD [sklearn] + learning rate = 0.001 + penalty 'l2' voir http://scikit-learn.org/
             print('Perceptron [sklearn]')
@@ -117,25 +130,371 @@ class ClassifieurLineaire:
 
         print('w = ', self.w, 'w_0 = ', self.w_0, '\n')
 
+    def perceptron_lots(self, x_train, t_train, eta=0.001):
+        """
+        Entraîne ``self.w`` et ``self.w_0`` avec l'algorithme du perceptron appliqué à des
+        mini-lots de ``self.taille_lot`` données. À chaque époque, les données sont parcourues
+        dans un ordre aléatoire (permutation des indices) ; pour chaque lot, les prédictions,
+        les erreurs et la mise à jour des poids sont calculées avec des opérations matricielles.
+
+        L'entraînement s'arrête après ``self.nb_epoques_max`` époques, ou plus tôt lorsqu'une
+        époque ne fait aucune mise à jour (données séparées) ou lorsque le critère du perceptron
+        (équation 4.54 du livre de Bishop) ne diminue plus pendant ``self.patience`` époques.
+
+        Retourne le nombre d'époques effectuées.
+        """
+        N = x_train.shape[0]
+        signes = 2 * t_train - 1  # cibles dans {-1, 1}
+        meilleure_perte = np.inf
+        epoques_sans_progres = 0
+        epoque = 0
+
+        for epoque in range(1, self.nb_epoques_max + 1):
+            permutation = np.random.permutation(N)
+            nb_mises_a_jour = 0
+
+            for debut in range(0, N, self.taille_lot):
+                lot = permutation[debut:debut + self.taille_lot]
+                x_lot = x_train[lot]
+                erreurs = t_train[lot] - (np.dot(x_lot, self.w) + self.w_0 > 0)
+
+                nb_erreurs = np.count_nonzero(erreurs)
+                if nb_erreurs > 0:
+                    self.w += eta * np.dot(erreurs, x_lot)
+                    self.w_0 += eta * np.sum(erreurs)
+                    nb_mises_a_jour += nb_erreurs
+
+            if nb_mises_a_jour == 0:
+                break
+
+            # Critère du perceptron : somme de -t_n (w^T x_n + w_0) sur les données mal classées
+            marges = signes * (np.dot(x_train, self.w) + self.w_0)
+            perte = -np.sum(marges[marges <= 0])
+            if perte < meilleure_perte * (1 - 1e-4):
+                meilleure_perte = perte
+                epoques_sans_progres = 0
+            else:
+                epoques_sans_progres += 1
+                if epoques_sans_progres >= self.patience:
+                    break
+
+        return epoque
+
+    def regression_logistique_irls(self, x_train, t_train, nb_iterations_max=50, tol=1e-8):
+        """
+        Entraîne ``self.w`` et ``self.w_0`` par régression logistique avec un terme de
+        régularisation (self.lamb / 2) ||w||^2 (le biais w_0 n'est pas régularisé), à l'aide
+        de la méthode de Newton-Raphson (IRLS, section 4.3.3 du livre de Bishop).
+
+        Avec phi = [1, x] et y = sigma(phi w~), chaque itération calcule
+
+            gradient = phi^T (y - t) + lamb * R w~
+            H = phi^T B phi + lamb * R,     B = diag(y (1 - y))
+
+        où R est l'identité sans le terme du biais, puis w~ <- w~ - H^-1 gradient.
+        L'entraînement s'arrête lorsque le pas de Newton devient négligeable.
+
+        Retourne le nombre d'itérations effectuées.
+        """
+        phi = np.hstack([np.ones((x_train.shape[0], 1)), x_train])
+        regularisation = np.full(phi.shape[1], float(self.lamb))
+        regularisation[0] = 0.
+
+        w_tilde = np.zeros(phi.shape[1])
+        for iteration in range(1, nb_iterations_max + 1):
+            y = expit(np.dot(phi, w_tilde))
+            gradient = np.dot(phi.T, y - t_train) + regularisation * w_tilde
+            hessienne = np.dot(phi.T * (y * (1 - y)), phi) + np.diag(regularisation)
+
+            pas = FactorisationCholesky(hessienne).resoudre(gradient)
+            w_tilde -= pas
+            if np.max(np.abs(pas)) <= tol * (1 + np.max(np.abs(w_tilde))):
+                break
+
+        self.w_0 = w_tilde[0]
+        self.w = w_tilde[1:]
+        return iteration
+
+    def parametres_generatifs(self):
+        """
+        Calcule ``self.w`` et ``self.w_0`` (équations 4.66 et 4.67 du livre de Bishop) à partir des
+        moments des deux classes gardés dans ``self.moments``. Lorsque les covariances sont
+        diagonales (vecteurs de taille D), S^-1 est appliquée en O(D).
+        """
+        (N1, mu_1, S1), (N2, mu_2, S2) = self.moments
+
+        p = N1/(N1+N2)
+
+        S = p*S1 + (1-p)*S2
+        mu = np.column_stack([mu_1, mu_2])
+
+        if S.ndim == 1:  # covariance diagonale
+            inv_S_mu = mu / (S + self.lamb)[:, None]
+        else:
+            S += np.identity(S.shape[0]) * self.lamb  # ne pas oublier la diagonale
+
+            # Une seule factorisation de S pour les deux membres de droite mu_1 et mu_2
+            inv_S_mu = FactorisationCholesky(S).resoudre(mu)
+
+        self._poids_generatifs(N1, N2, mu_1, mu_2, inv_S_mu)
+
+    def parametres_faible_rang(self, x_train, t_train, nb_iterations_puissance=2):
+        """
+        Calcule ``self.w`` et ``self.w_0`` de la classification générative en approchant la
+        covariance partagée par une matrice diagonale plus une matrice de rang k = ``self.rang`` :
+
+            S ~= diag(d) + U U^T + lamb * I,   U de taille [D, k]
+
+        Avec Z la matrice [N, D] des données centrées (chacune par la moyenne de sa classe) divisée
+        par sqrt(N), on a S = Z^T Z. Les k directions principales de S sont obtenues sans former S,
+        par une méthode d'itération de sous-espace aléatoire (produits par Z et Z^T uniquement), et d
+        est choisi pour que la diagonale de l'approximation soit exacte. S^-1 mu est ensuite calculé
+        avec l'identité de Woodbury :
+
+            S^-1 b = D^-1 b - D^-1 U (I + U^T D^-1 U)^-1 U^T D^-1 b
+
+        Le temps de calcul est en O(N D k) et la mémoire supplémentaire en O(D k).
+        """
+        N1 = np.count_nonzero(t_train == 1)
+        N2 = np.count_nonzero(t_train == 0)
+        N = N1 + N2
+
+        mu_1 = np.mean(x_train[t_train == 1], axis=0)
+        mu_2 = np.mean(x_train[t_train == 0], axis=0)
+
+        Z = np.where((t_train == 1)[:, None], x_train - mu_1, x_train - mu_2) / np.sqrt(N)
+        diagonale_S = np.sum(np.square(Z), axis=0)
+
+        # Itération de sous-espace : Q approche l'espace des k premiers vecteurs propres de Z^T Z
+        k = min(self.rang, *Z.shape)
+        generateur = np.random.default_rng(self.random_state)
+        Q = generateur.standard_normal((Z.shape[1], min(k + 5, Z.shape[1])))
+        for i in range(nb_iterations_puissance + 1):
+            Q, _ = np.linalg.qr(np.dot(Z.T, np.dot(Z, Q)))
+        _, valeurs_singulieres, Vt = np.linalg.svd(np.dot(Z, Q), full_matrices=False)
+        U = np.dot(Q, Vt[:k].T) * valeurs_singulieres[:k]
+
+        d = np.maximum(diagonale_S - np.sum(np.square(U), axis=1), 0) + self.lamb
+        d = np.maximum(d, np.finfo(float).eps * np.max(d))
+
+        # Identité de Woodbury pour les deux membres de droite mu_1 et mu_2
+        inv_D_mu = np.column_stack([mu_1, mu_2]) / d[:, None]
+        inv_D_U = U / d[:, None]
+        capacite = np.identity(k) + np.dot(U.T, inv_D_U)
+        inv_S_mu = inv_D_mu - np.dot(inv_D_U, np.linalg.solve(capacite, np.dot(U.T, inv_D_mu)))
+
+        self._poids_generatifs(N1, N2, mu_1, mu_2, inv_S_mu)
+
+    def _poids_generatifs(self, N1, N2, mu_1, mu_2, inv_S_mu):
+        """
+        Assigne ``self.w`` et ``self.w_0`` (équations 4.66 et 4.67 du livre de Bishop) à partir de
+        ``inv_S_mu``, la matrice [D, 2] des colonnes S^-1 mu_1 et S^-1 mu_2.
+        """
+        inv_S_mu_1, inv_S_mu_2 = inv_S_mu[:, 0], inv_S_mu[:, 1]
+
+        self.w = inv_S_mu_1 - inv_S_mu_2
+        self.w_0 = -0.5*(mu_1.T)@inv_S_mu_1 + 0.5*(mu_2.T)@inv_S_mu_2 + np.log(N1/N2)
+
+    def _covariance_diagonale(self):
+        """
+        Retourne vrai si les moments doivent garder des covariances diagonales
+        """
+        if self.covariance not in ('pleine', 'diagonale', 'faible_rang'):
+            raise ValueError(f"Structure de covariance inconnue : {self.covariance}")
+        return self.covariance == 'diagonale'
+
+    def partial_fit(self, x_chunk, t_chunk):
+        """
+        Poursuit l'entraînement de la classification générative (methode 1) avec un nouveau bloc
+        de données ``x_chunk`` et d'étiquettes ``t_chunk``, sans repasser sur les données déjà vues.
+
+        Les moments de chaque classe sont mis à jour avec la formule de fusion de Chan et al.
+        (voir ``fusion_moments``), puis ``self.w`` et ``self.w_0`` sont recalculés. Le résultat
+        est le même qu'un appel à ``entrainement()`` sur l'ensemble des blocs reçus.
+        """
+        if self.methode != 1 or self.covariance == 'faible_rang':
+            raise ValueError("partial_fit n'est disponible que pour la classification generative (methode 1) "
+                             "avec une covariance pleine ou diagonale")
+
+        diagonale = self._covariance_diagonale()
+        moments_bloc = [self.moments_classe(x_chunk[t_chunk == 1], diagonale),
+                        self.moments_classe(x_chunk[t_chunk == 0], diagonale)]
+        self._ajouter_moments(moments_bloc)
+
+    def merge(self, other):
+        """
+        Fusionne les moments d'un autre classifieur génératif ``other`` (entraîné sur d'autres
+        données, par exemple dans un autre processus) avec ceux de ce classifieur, puis recalcule
+        ``self.w`` et ``self.w_0``.
+
+        Les deux classifieurs doivent utiliser la classification générative (methode 1) avec la
+        même structure de covariance, pleine ou diagonale : la covariance 'faible_rang' ne garde
+        pas de moments.
+        """
+        if {self.methode, other.methode} != {1} or 'faible_rang' in (self.covariance, other.covariance):
+            raise ValueError("merge n'est disponible que pour la classification generative (methode 1) "
+                             "avec une covariance pleine ou diagonale")
+        if other.covariance != self.covariance:
+            raise ValueError(f"Impossible de fusionner des classifieurs de covariances differentes "
+                             f"({self.covariance} et {other.covariance})")
+
+        if other.moments is not None:
+            self._ajouter_moments(other.moments)
+
+    def _ajouter_moments(self, moments):
+        """
+        Fusionne ``moments`` (une liste de moments (N, mu, S) par classe) avec ``self.moments``
+        """
+        if self.moments is None:
+            self.moments = moments
+        else:
+            self.moments = [self.fusion_moments(a, b) for a, b in zip(self.moments, moments)]
+
+        # Il faut au moins une donnée de chaque classe pour définir le modèle
+        if self.moments[0][0] > 0 and self.moments[1][0] > 0:
+            self.parametres_generatifs()
+
+    @staticmethod
+    def fusion_moments(moments_a, moments_b):
+        """
+        Retourne les moments (N, mu, S) de l'union de deux ensembles de données à partir de leurs
+        moments ``moments_a`` et ``moments_b`` (formule de Chan et al.) :
+
+            N = N_a + N_b
+            mu = mu_a + (mu_b - mu_a) N_b / N
+            N S = N_a S_a + N_b S_b + (mu_b - mu_a)(mu_b - mu_a)^T N_a N_b / N
+        """
+        N_a, mu_a, S_a = moments_a
+        N_b, mu_b, S_b = moments_b
+        if N_a == 0:
+            return moments_b
+        if N_b == 0:
+            return moments_a
+
+        N = N_a + N_b
+        delta = mu_b - mu_a
+        mu = mu_a + delta * N_b / N
+        dispersion = np.outer(delta, delta) if np.ndim(S_a) == 2 else np.square(delta)
+        S = (N_a * S_a + N_b * S_b + dispersion * N_a * N_b / N) / N
+        return N, mu, S
+
+    @staticmethod
+    def moments_classe(x_classe, diagonale=False):
+        """
+        Retourne le nombre de donnees N, la moyenne ``mu`` (équations 4.75 et 4.76 du livre de Bishop)
+        et la matrice de covariance ``S`` (équation 4.79) des données ``x_classe`` [N, D] d'une classe.
+
+        La somme des produits externes est calculée avec un seul produit matriciel sur les données
+        centrées, sans construire de tableau [N, D, D].
+
+        Lorsque ``diagonale`` est vrai, seule la diagonale de S (les variances, un vecteur de taille D)
+        est calculée.
+        """
+        N, D = x_classe.shape
+        if N == 0:
+            return 0, np.zeros(D), np.zeros(D) if diagonale else np.zeros((D, D))
+
+        mu = np.mean(x_classe, axis=0)
+        centrees = x_classe - mu
+        if diagonale:
+            return N, mu, np.mean(np.square(centrees), axis=0)
+        return N, mu, np.dot(centrees.T, centrees) / N
+
     def prediction(self, x):
         """
         Retourne la prédiction du classifieur lineaire.  Retourne 1 si x est
         devant la frontière de décision et 0 sinon.
 
-        ``x`` est un tableau 1D Numpy
+        ``x`` est un tableau 1D Numpy (ou 2D [N, D], auquel cas un tableau 1D
+        de N prédictions est retourné, voir ``predict_batch``)
 
         Cette méthode suppose que la méthode ``entrainement()``
         a préalablement été appelée. Elle doit utiliser les champs ``self.w``
         et ``self.w_0`` afin de faire cette classification.
         """
-        xT = x.reshape(-1, 1)
-        score = np.matmul(self.w, xT) + self.w_0
+        if np.ndim(x) == 2:  # plusieurs entrées [N, D]
+            return self.predict_batch(x)
+
+        score = self.decision_function(x)
 
         if score > 0:
             return 1
         else:
             return 0
 
+    def decision_function(self, x):
+        """
+        Retourne le score w^T x + w_0 du classifieur : un scalaire si ``x`` est
+        un tableau 1D Numpy, un tableau 1D de N scores si ``x`` est un tableau
+        2D [N, D], calculé en un seul produit matrice-vecteur.
+        """
+        return np.dot(x, self.w) + self.w_0
+
+    def predict_batch(self, x):
+        """
+        Retourne le tableau 1D des prédictions (1 ou 0) du classifieur pour
+        toutes les entrées du tableau 2D Numpy ``x`` [N, D].
+        """
+        return (self.decision_function(x) > 0).astype(int)
+
+    def balayage_seuils(self, x, t, ajuster=False):
+        """
+        Évalue le classifieur pour tous les seuils de décision possibles en un seul passage.
+
+        Les scores w^T x + w_0 (voir ``decision_function``) sont calculés une fois puis triés en
+        ordre décroissant : classer les k premiers comme positifs (score > seuil) correspond à une
+        coupure, et les sommes cumulées des cibles donnent les vrais et faux positifs de toutes les
+        coupures en O(N log N), au lieu d'un passage sur les données par seuil. S'applique à toutes
+        les méthodes puisque seuls ``self.w`` et ``self.w_0`` sont utilisés.
+
+        x : tableau 2D Numpy [N, D] des entrées
+        t : tableau 1D Numpy des cibles (0 ou 1)
+        ajuster : lorsque vrai, ``self.w_0`` est décalé pour utiliser le meilleur seuil
+
+        Retourne un dictionnaire contenant, pour chaque coupure distincte, les tableaux 1D
+        'seuils', 'taux_erreur', 'tpr' (taux de vrais positifs) et 'fpr' (taux de faux positifs),
+        ainsi que 'meilleur_seuil' et 'meilleure_erreur'. Les seuils candidats sont les milieux
+        des écarts entre deux scores consécutifs ; parmi ceux de même erreur minimale, le plus proche
+        de 0 est retenu. Lorsque le seuil actuel (0) atteint déjà l'erreur minimale, 'meilleur_seuil'
+        vaut 0 et ``self.w_0`` n'est pas modifié.
+        """
+        scores = self.decision_function(x)
+        ordre = np.argsort(-scores, kind='stable')
+        scores = scores[ordre]
+        positifs = np.asarray(t)[ordre] == 1
+
+        N = len(scores)
+        P = np.count_nonzero(positifs)
+        vrais_positifs = np.concatenate([[0], np.cumsum(positifs)])  # pour k = 0..N premiers classés positifs
+        faux_positifs = np.arange(N + 1) - vrais_positifs
+
+        # Seules les coupures entre deux scores différents sont réalisables
+        coupures = np.concatenate([[True], scores[:-1] > scores[1:], [True]])
+        seuils = np.concatenate([[scores[0]], (scores[:-1] + scores[1:]) / 2, [np.nextafter(scores[-1], -np.inf)]])
+
+        taux_erreur = (faux_positifs + P - vrais_positifs) / N
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tpr = vrais_positifs / P
+            fpr = faux_positifs / (N - P)
+
+        # Erreur au seuil actuel : les scores > 0 sont classés positifs
+        erreur_actuelle = taux_erreur[np.count_nonzero(scores > 0)]
+
+        seuils, taux_erreur, tpr, fpr = seuils[coupures], taux_erreur[coupures], tpr[coupures], fpr[coupures]
+        candidats = np.flatnonzero(taux_erreur == np.min(taux_erreur))
+        meilleur = candidats[np.argmin(np.abs(seuils[candidats]))]
+
+        if erreur_actuelle <= taux_erreur[meilleur]:
+            meilleur_seuil, meilleure_erreur = 0., erreur_actuelle
+        else:
+            meilleur_seuil, meilleure_erreur = seuils[meilleur], taux_erreur[meilleur]
+
+        if ajuster:
+            self.w_0 -= meilleur_seuil
+
+        return {'seuils': seuils, 'taux_erreur': taux_erreur, 'tpr': tpr, 'fpr': fpr,
+                'meilleur_seuil': meilleur_seuil, 'meilleure_erreur': meilleure_erreur}
+
     @staticmethod
     def erreur(t, prediction):
         """
@@ -151,32 +510,84 @@ class ClassifieurLineaire:
             return 1
         return 0
 
-    def afficher_donnees_et_modele(self, x_train, t_train, x_test, t_test):
+    @staticmethod
+    def taux_erreur(t, prediction):
+        """
+        Retourne la proportion (entre 0 et 1) des éléments du tableau de cibles
+        ``t`` différents du tableau de prédictions ``prediction``.
+        """
+        return np.mean(np.asarray(t) != np.asarray(prediction))
+
+    def afficher_donnees_et_modele(self, x_train, t_train, x_test, t_test, mode='points', budget=5000,
+                                   resolution=200, fichier=None):
         """
         afficher les donnees et le modele
 
         x_train, t_train : donnees d'entrainement
         x_test, t_test : donnees de test
+        mode : 'points' affiche toutes les donnees, 'sous_echantillon' au plus ``budget`` donnees
+               tirees dans chaque classe en proportion de sa taille, et 'densite' une image de
+               ``resolution`` x ``resolution`` cases ou la couleur de chaque case est la proportion
+               de donnees de la classe 1 (utile pour des centaines de milliers de points)
+        fichier : lorsque donne, les figures sont sauvegardees (nom_entrainement.ext et nom_test.ext)
+                  plutot qu'affichees, ce qui permet de les produire sans ecran
         """
-        plt.figure(0)
-        plt.scatter(x_train[:, 0], x_train[:, 1], s=t_train * 100 + 20, c=t_train)
-
-        pente = -self.w[0] / self.w[1]
         xx = np.linspace(np.min(x_test[:, 0]) - 2, np.max(x_test[:, 0]) + 2)
-        yy = pente * xx - self.w_0 / self.w[1]
-        plt.plot(xx, yy)
+
+        plt.figure(0)
+        self._afficher_ensemble(x_train, t_train, xx, mode, budget, resolution)
         plt.title('Training data')
 
         plt.figure(1)
-        plt.scatter(x_test[:, 0], x_test[:, 1], s=t_test * 100 + 20, c=t_test)
+        self._afficher_ensemble(x_test, t_test, xx, mode, budget, resolution)
+        plt.title('Testing data')
+
+        if fichier is None:
+            plt.show()
+        else:
+            racine, extension = os.path.splitext(fichier)
+            for numero, suffixe in ((0, '_entrainement'), (1, '_test')):
+                plt.figure(numero).savefig(racine + suffixe + (extension or '.png'))
+                plt.close(numero)
+
+    def _afficher_ensemble(self, x, t, xx, mode, budget, resolution):
+        """
+        Affiche les donnees ``x``, ``t`` selon ``mode`` (voir ``afficher_donnees_et_modele``) et
+        la frontiere de decision sur l'intervalle ``xx`` dans la figure courante
+        """
+        if mode == 'densite':
+            total, bords_x, bords_y = np.histogram2d(x[:, 0], x[:, 1], bins=resolution)
+            classe_1, _, _ = np.histogram2d(x[t == 1, 0], x[t == 1, 1], bins=[bords_x, bords_y])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                proportion = np.ma.masked_where(total == 0, classe_1 / total)
+            plt.pcolormesh(bords_x, bords_y, proportion.T, vmin=0, vmax=1)
+            limites = plt.axis()
+
+        else:
+            if mode == 'sous_echantillon' and len(t) > budget:
+                indices = self.sous_echantillon_stratifie(t, budget)
+                x, t = x[indices], t[indices]
+            plt.scatter(x[:, 0], x[:, 1], s=t * 100 + 20, c=t)
+            limites = None
 
         pente = -self.w[0] / self.w[1]
-        xx = np.linspace(np.min(x_test[:, 0]) - 2, np.max(x_test[:, 0]) + 2)
         yy = pente * xx - self.w_0 / self.w[1]
         plt.plot(xx, yy)
-        plt.title('Testing data')
+        if limites is not None:
+            plt.axis(limites)  # la frontiere ne doit pas agrandir l'image de densite
 
-        plt.show()
+    @staticmethod
+    def sous_echantillon_stratifie(t, budget):
+        """
+        Retourne les indices d'au plus ``budget`` donnees tirees au hasard (sans remise) dans
+        chaque classe de ``t``, en proportion de la taille de la classe.
+        """
+        indices = []
+        for classe in np.unique(t):
+            indices_classe = np.flatnonzero(t == classe)
+            nb = max(1, int(round(budget * len(indices_classe) / len(t))))
+            indices.append(np.random.choice(indices_classe, min(nb, len(indices_classe)), replace=False))
+        return np.sort(np.concatenate(indices))
 
     def parametres(self):
         """
@@ -11,12 +11,38 @@ import matplotlib.pyplot as plt
 import sys
 
 from sklearn.model_selection import train_test_split
+from sklearn.cluster import MiniBatchKMeans
 from itertools import product
 from tqdm import tqdm
+from solveur_lineaire import FactorisationCholesky
+
+
+def distances_carrees(X, Y, normes_X=None, normes_Y=None):
+    """
+    Retourne la matrice [N, M] des distances euclidiennes au carré entre les rangées de X [N, D]
+    et celles de Y [M, D], calculée avec un seul produit matriciel :
+
+        ||x - y||^2 = ||x||^2 + ||y||^2 - 2 x^T y
+
+    normes_X, normes_Y : normes au carré des rangées de X et de Y, si elles sont déjà connues
+
+    Les petites valeurs négatives dues aux erreurs d'arrondi sont ramenées à 0.
+    """
+    if normes_X is None:
+        normes_X = np.einsum('ij,ij->i', X, X)
+    if normes_Y is None:
+        normes_Y = np.einsum('ij,ij->i', Y, Y)
+
+    distances = np.dot(X, Y.T)
+    distances *= -2
+    distances += normes_X[:, None]
+    distances += normes_Y[None, :]
+    return np.maximum(distances, 0, out=distances)
 
 
 class MAPnoyau:
-    def __init__(self, lamb=0.2, sigma_square=1.06, b=1.0, c=0.1, d=1.0, M=2, noyau='rbf'):
+    def __init__(self, lamb=0.2, sigma_square=1.06, b=1.0, c=0.1, d=1.0, M=2, noyau='rbf',
+                 nb_reperes=None, selection='uniforme'):
         """
         Classe effectuant de la segmentation de données 2D 2 classes à l'aide de la méthode à noyau.
 
@@ -25,6 +51,9 @@ class MAPnoyau:
         b, d: paramètres du noyau sigmoidal
         M,c: paramètres du noyau polynomial
         noyau: rbf, lineaire, olynomial ou sigmoidal
+        nb_reperes: si spécifié, nombre m de points repères de l'approximation de Nyström
+                    utilisée par ``entrainement()`` (None : méthode à noyau exacte)
+        selection: choix des points repères, 'uniforme', 'kmeans' ou 'levier'
         """
         self.lamb = lamb
         self.a = None
@@ -35,6 +64,9 @@ class MAPnoyau:
         self.d = d
         self.noyau = noyau
         self.x_train = None
+        self.normes_train = None
+        self.nb_reperes = nb_reperes
+        self.selection = selection
 
     def entrainement(self, x_train, t_train):
         """
@@ -54,33 +86,131 @@ class MAPnoyau:
         Cette méthode doit assigner le champs ``self.a`` tel que spécifié à
         l'equation 6.8 du livre de Bishop et garder en mémoire les données
         d'apprentissage dans ``self.x_train``
+
+        Si ``self.nb_reperes`` est plus petit que le nombre de données, l'entraînement
+        est fait avec l'approximation de Nyström (voir ``entrainement_nystrom()``).
         """
+        if self.nb_reperes is not None and self.nb_reperes < x_train.shape[0]:
+            self.entrainement_nystrom(x_train, t_train)
+            return
+
         self.x_train = x_train
+        self.normes_train = np.einsum('ij,ij->i', x_train, x_train)
+
         # Gram matrix
-        K = None
-        if self.noyau == "rbf":
-            tempA = np.zeros(shape=(x_train.shape[0], x_train.shape[0]), dtype=float)
+        K = self.noyau_croise(x_train)
+
+        self.a = FactorisationCholesky(K + (np.identity(x_train.shape[0]) * self.lamb)).resoudre(t_train)
+
+    def entrainement_nystrom(self, x_train, t_train, chunk_size=4096):
+        """
+        Entraîne le modèle avec l'approximation de Nyström de la matrice de Gram,
+        K ~ K_nm W^-1 K_mn, où W [m, m] est la matrice de Gram des m points repères et
+        K_nm [N, m] celle entre les données et les points repères.
+
+        En posant y(x) = k_m(x)^T a, le problème MAP devient le système m x m
+
+            (K_mn K_nm + lambda W) a = K_mn t
+
+        dont les termes sont accumulés par blocs de ``chunk_size`` données : le temps
+        est en O(N m^2) et la mémoire en O(chunk_size m + m^2).  Les points repères
+        remplacent les données d'entraînement dans ``self.x_train``, de sorte que
+        ``prediction()`` et ``predict_batch()`` s'utilisent sans changement, en O(m)
+        par entrée.
+        """
+        reperes = self.selection_reperes(x_train)
+        self.x_train = reperes
+        self.normes_train = np.einsum('ij,ij->i', reperes, reperes)
+
+        A = self.lamb * self.noyau_croise(reperes)
+        b = np.zeros(reperes.shape[0])
+        for debut in range(0, x_train.shape[0], chunk_size):
+            bloc = slice(debut, debut + chunk_size)
+            K_bloc = self.noyau_croise(x_train[bloc])
+            A += np.dot(K_bloc.T, K_bloc)
+            b += np.dot(K_bloc.T, t_train[bloc])
 
-            for i, j in product(range(x_train.shape[0]), range(x_train.shape[0])):
-                tempB = x_train[i] - x_train[j]
-                tempA[i, j] = -(np.square(tempB[0]) + np.square(tempB[1])) / (2 * self.sigma_square)
+        self.a = FactorisationCholesky(A).resoudre(b)
 
-            K = np.exp(tempA)
+    def selection_reperes(self, x_train, chunk_size=4096):
+        """
+        Retourne les ``self.nb_reperes`` points repères de l'approximation de Nyström,
+        choisis selon ``self.selection`` :
+
+            'uniforme' : tirés au hasard parmi les données, sans remise
+            'kmeans'   : centres d'un k-means (mini-lots) sur les données
+            'levier'   : tirés au hasard avec une probabilité proportionnelle aux scores de
+                         levier l_n = (k(x_n, x_n) - k_S(x_n)^T (K_SS + lambda I)^-1 k_S(x_n)) / lambda,
+                         estimés à partir d'un premier ensemble S de repères uniformes
+        """
+        m = self.nb_reperes
+
+        if self.selection == "uniforme":
+            return x_train[np.random.choice(x_train.shape[0], m, replace=False)]
+
+        elif self.selection == "kmeans":
+            return MiniBatchKMeans(n_clusters=m, n_init=3).fit(x_train).cluster_centers_
+
+        elif self.selection == "levier":
+            pilote = x_train[np.random.choice(x_train.shape[0], m, replace=False)]
+            self.x_train = pilote
+            self.normes_train = np.einsum('ij,ij->i', pilote, pilote)
+            solveur = FactorisationCholesky(self.noyau_croise(pilote) + (np.identity(m) * self.lamb))
+
+            leviers = np.empty(x_train.shape[0])
+            for debut in range(0, x_train.shape[0], chunk_size):
+                bloc = slice(debut, debut + chunk_size)
+                K_bloc = self.noyau_croise(x_train[bloc])
+                if self.noyau == "rbf":
+                    diagonale = self.transformation_noyau(np.zeros(K_bloc.shape[0]))
+                else:
+                    diagonale = self.transformation_noyau(np.einsum('ij,ij->i', x_train[bloc], x_train[bloc]))
+                residu = diagonale - np.einsum('ij,ji->i', K_bloc, solveur.resoudre(K_bloc.T))
+                leviers[bloc] = np.maximum(residu, 1e-12) / self.lamb
+
+            return x_train[np.random.choice(x_train.shape[0], m, replace=False, p=leviers / leviers.sum())]
+
+        else:
+            print("\nMauvaise sélection des points repères entrée comme paramètre")
+            sys.exit(1)
+
+    def transformation_noyau(self, G):
+        """
+        Applique, élément par élément, le noyau ``self.noyau`` à une matrice G qui contient
+        les distances au carré entre les entrées (noyau rbf) ou leurs produits scalaires
+        (noyaux lineaire, sigmoidal et polynomial).
+        """
+        if self.noyau == "rbf":
+            return np.exp(-G / (2 * self.sigma_square))
 
         elif self.noyau == "lineaire":
-            K = x_train@x_train.T
+            return G
 
         elif self.noyau == "sigmoidal":
-            K = np.tanh(self.b * x_train@x_train.T + self.d)
+            return np.tanh(self.b * G + self.d)
 
         elif self.noyau == "polynomial":
-            K = np.power(((x_train@x_train.T) + self.c), self.M)
+            return np.power(G + self.c, self.M)
 
         else:
             print("\nMauvais noyau entré comme paramètre")
             sys.exit(1)
 
-        self.a = np.linalg.solve(K + (np.identity(x_train.shape[0]) * self.lamb), np.identity(x_train.shape[0]))@t_train
+    def noyau_croise(self, X):
+        """
+        Retourne la matrice [B, N] des valeurs du noyau entre les B entrées de ``X``
+        et les N données d'entraînement ``self.x_train``.
+
+        Un seul produit matriciel X x_train^T est effectué, quel que soit le noyau :
+        pour le noyau rbf, les normes au carré de ``self.x_train`` sont celles gardées
+        en mémoire par ``entrainement()``.
+        """
+        if self.noyau == "rbf":
+            G = distances_carrees(X, self.x_train, normes_Y=self.normes_train)
+        else:
+            G = np.dot(X, self.x_train.T)
+
+        return self.transformation_noyau(G)
 
     def prediction(self, x):
         """
@@ -95,23 +225,7 @@ class MAPnoyau:
         classification binaire, la prediction est +1 lorsque y(x)>0.5 et 0
         sinon
         """
-        k = None
-        if self.noyau == "rbf":
-            tempA = np.zeros(shape=(self.x_train.shape[0]), dtype=float)
-
-            tempB = self.x_train[:] - x
-            tempA[:] = -(np.square(tempB[:, 0]) + np.square(tempB[:, 1])) / (2 * self.sigma_square)
-
-            k = np.exp(tempA)
-
-        elif self.noyau == "lineaire":
-            k = self.x_train@x
-
-        elif self.noyau == "sigmoidal":
-            k = np.tanh(self.b * (self.x_train@x) + self.d)
-
-        else:
-            k = np.power(((self.x_train@x) + self.c), self.M)
+        k = self.noyau_croise(np.atleast_2d(x))[0]
 
         y = k@self.a
 
@@ -120,6 +234,24 @@ class MAPnoyau:
         else:
             return 0
 
+    def predict_batch(self, X, chunk_size=4096):
+        """
+        Retourne les prédictions (0 ou 1) et les sorties y(x) (équation 6.9) pour
+        toutes les entrées du tableau 2D Numpy ``X``.
+
+        Les entrées sont traitées par blocs de ``chunk_size`` rangées : la mémoire
+        utilisée est bornée par une matrice noyau [chunk_size, N] et chaque bloc
+        ne demande qu'un seul produit matriciel avec ``self.x_train``.
+        """
+        scores = np.empty(X.shape[0], dtype=float)
+
+        for debut in range(0, X.shape[0], chunk_size):
+            bloc = slice(debut, debut + chunk_size)
+            scores[bloc] = np.dot(self.noyau_croise(X[bloc]), self.a)
+
+        etiquettes = (scores > 0.5).astype(int)
+        return etiquettes, scores
+
     def erreur(self, t, prediction):
         """
         Retourne la différence au carré entre
@@ -127,7 +259,52 @@ class MAPnoyau:
         """
         return np.square(t - prediction)
 
-    def validation_croisee(self, x_tab, t_tab):
+    def erreur_plis(self, plis):
+        """
+        Retourne la somme, sur tous les plis, des erreurs de validation obtenues avec
+        les hyperparamètres courants.
+
+        ``plis`` est une liste de tuples (G_train, G_val, t_train, t_val) où G_train et
+        G_val contiennent les distances au carré ou les produits scalaires (voir
+        ``transformation_noyau()``) entre les données d'entraînement du pli, et entre
+        ses données de validation et ses données d'entraînement.
+        """
+        sum_error = 0
+        for G_train, G_val, t_train, t_val in plis:
+            K = self.transformation_noyau(G_train)
+            a = FactorisationCholesky(K + (np.identity(K.shape[0]) * self.lamb)).resoudre(t_train)
+            y_hat = (np.dot(self.transformation_noyau(G_val), a) > 0.5).astype(int)  # vecteur de prédiction
+            sum_error += np.sum(self.erreur(t_val, y_hat))
+
+        return sum_error
+
+    def erreur_plis_spectral(self, plis, lambdas):
+        """
+        Retourne un tableau 1D Numpy contenant, pour chaque valeur de ``lambdas``, la somme
+        sur tous les plis des erreurs de validation obtenues avec les autres hyperparamètres
+        courants (voir ``erreur_plis()`` pour le format de ``plis``).
+
+        La matrice de Gram de chaque pli ne dépend pas de lambda : elle est diagonalisée
+        une seule fois, K = Q diag(v) Q^T, et pour chaque lambda
+
+            a = Q diag(1 / (v + lambda)) Q^T t
+
+        de sorte que les sorties de validation K_val a de tous les lambdas sont obtenues
+        par un seul produit matriciel.
+        """
+        sum_error = np.zeros(len(lambdas))
+        for G_train, G_val, t_train, t_val in plis:
+            valeurs, vecteurs = np.linalg.eigh(self.transformation_noyau(G_train))
+            projection = np.dot(vecteurs.T, t_train)
+            K_val_Q = np.dot(self.transformation_noyau(G_val), vecteurs)
+
+            y = np.dot(K_val_Q * projection, 1 / (valeurs[:, None] + lambdas[None, :]))  # [nb_val, nb_lambdas]
+            y_hat = (y > 0.5).astype(int)  # prédictions pour chaque lambda
+            sum_error += np.sum(self.erreur(t_val[:, None], y_hat), axis=0)
+
+        return sum_error
+
+    def validation_croisee(self, x_tab, t_tab, spectral=True):
         """
         Cette fonction trouve les meilleurs hyperparametres ``self.sigma_square``,
         ``self.c`` et ``self.M`` (tout dépendant du noyau selectionné) et
@@ -139,133 +316,70 @@ class MAPnoyau:
         de 0.000000001 à 2, les valeurs de ``self.c`` de 0 à 5, les valeurs
         de ''self.b'' et ''self.d'' de 0.00001 à 0.01 et ``self.M`` de 2 à 6
 
+        spectral: si True, toutes les valeurs de lambda sont évaluées à partir d'une seule
+        diagonalisation de la matrice de Gram de chaque pli (voir ``erreur_plis_spectral()``),
+        sinon un système K + lambda I est résolu pour chaque lambda.
+
+        La recherche utilise toujours la méthode à noyau exacte (matrices N x N) : elle
+        n'est pas disponible avec l'approximation de Nyström (``self.nb_reperes``).
         """
+        if self.nb_reperes is not None and self.nb_reperes < x_tab.shape[0]:
+            print("\nLa validation croisée n'est pas disponible avec l'approximation de Nyström")
+            sys.exit(1)
 
-        meilleur_err = np.inf
         num_fold = 10
 
+        # Les distances au carré (noyau rbf) ou les produits scalaires (autres noyaux) entre
+        # toutes les paires de x_tab ne dépendent pas des hyperparamètres : ils sont calculés
+        # une seule fois, puis découpés selon les indices de chaque pli.
+        if self.noyau == "rbf":
+            G = distances_carrees(x_tab, x_tab)
+        else:
+            G = np.dot(x_tab, x_tab.T)
+
+        plis = []
+        for k in range(num_fold):
+            idx_train, idx_val = train_test_split(np.arange(x_tab.shape[0]), test_size=0.2,
+                                                  random_state=k, shuffle=True)
+            plis.append((G[np.ix_(idx_train, idx_train)], G[np.ix_(idx_val, idx_train)],
+                         t_tab[idx_train], t_tab[idx_val]))
+
+        # Grille des hyperparamètres du noyau (tous sauf lambda)
+        lambdas = np.linspace(0.000000001, 2, 10)
         if self.noyau == "rbf":
-            meilleur_sigma = -1
-            meilleur_lamb = -1
-            for lambda_param, hyper in tqdm(product(np.linspace(0.000000001, 2, 10), np.linspace(0.000000001, 2, 10))):
-                self.sigma_square = hyper
-                self.lamb = lambda_param
-                sum_error = 0
-
-                for k in range(num_fold):  # K-fold validation
-                    X_train, X_val, y_train, y_val = train_test_split(x_tab, t_tab, test_size=0.2,
-                                                                      random_state=k, shuffle=True)
-                    self.entrainement(X_train, y_train)
-                    sum_err_locale = 0
-                    for i in range(X_val.shape[0]):
-                        y_hat = self.prediction(X_val[i])  # vecteur de prédiction
-                        sum_err_locale += np.sum(self.erreur(y_val[i], y_hat))
-                    sum_error += sum_err_locale
-
-                avg_err_locale = sum_error / (num_fold*X_val.shape[0])  # Moyenne des erreurs sur le K-fold
-                if(avg_err_locale < meilleur_err):
-                    meilleur_err = avg_err_locale
-                    meilleur_sigma = hyper
-                    meilleur_lamb = lambda_param
-
-            self.lamb = meilleur_lamb
-            self.sigma_square = meilleur_sigma
-            self.entrainement(x_tab, t_tab)
+            grille = [{'sigma_square': hyper} for hyper in np.linspace(0.000000001, 2, 10)]
 
         elif self.noyau == "lineaire":
             # juste lambda à tester
-            meilleur_lamb = -1
-
-            for lambda_param in tqdm(np.linspace(0.000000001, 2, 10)):
-                self.lamb = lambda_param
-                sum_error = 0
-
-                for k in range(num_fold):  # K-fold validation
-                    X_train, X_val, y_train, y_val = train_test_split(x_tab, t_tab, test_size=0.2,
-                                                                      random_state=k, shuffle=True)
-                    self.entrainement(X_train, y_train)
-                    sum_err_locale = 0
-                    for i in range(X_val.shape[0]):
-                        y_hat = self.prediction(X_val[i])  # vecteur de prédiction
-                        sum_err_locale += self.erreur(y_val[i], y_hat)
-                    sum_error += sum_err_locale
-
-                avg_err_locale = sum_error/(num_fold)  # Moyenne des erreurs sur le K-fold
-                if(avg_err_locale < meilleur_err):
-                    meilleur_err = avg_err_locale
-                    meilleur_lamb = lambda_param
-
-            self.lamb = meilleur_lamb
-            self.entrainement(x_tab, t_tab)
+            grille = [{}]
 
         elif self.noyau == "sigmoidal":
-            meilleur_B = -1
-            meilleur_D = -1
-            meilleur_lamb = -1
-            for lambda_param, hyperD, hyperB in tqdm(product(np.linspace(0.000000001, 2, 10),
-                                                             np.linspace(0.00001, 0.01, 10),
-                                                             np.linspace(0.00001, 0.01, 10))):
-                self.b = hyperB
-                self.d = hyperD
-                self.lamb = lambda_param
-                sum_error = 0
-
-                for k in range(num_fold):  # K-fold validation
-                    X_train, X_val, y_train, y_val = train_test_split(x_tab, t_tab, test_size=0.2,
-                                                                      random_state=k, shuffle=True)
-                    self.entrainement(X_train, y_train)
-                    sum_err_locale = 0
-                    for i in range(X_val.shape[0]):
-                        y_hat = self.prediction(X_val[i])  # vecteur de prédiction
-                        sum_err_locale += self.erreur(y_val[i], y_hat)
-                    sum_error += sum_err_locale
-
-                avg_err_locale = sum_error/(num_fold)  # Moyenne des erreurs sur le K-fold
-                if(avg_err_locale < meilleur_err):
-                    meilleur_err = avg_err_locale
-                    meilleur_B = hyperB
-                    meilleur_D = hyperD
-                    meilleur_lamb = lambda_param
-
-            self.b = meilleur_B
-            self.d = meilleur_D
-            self.lamb = meilleur_lamb
-            self.entrainement(x_tab, t_tab)
+            grille = [{'d': hyperD, 'b': hyperB} for hyperD, hyperB in product(np.linspace(0.00001, 0.01, 10),
+                                                                                 np.linspace(0.00001, 0.01, 10))]
 
         else:  # polynomial
-            meilleur_M = -1
-            meilleur_C = -1
-            meilleur_lamb = -1
-
-            for lambda_param, hyperM, hyperC in tqdm(product(np.linspace(0.000000001, 2, 10),
-                                                             range(2, 7),
-                                                             np.linspace(0, 5, 100))):
-                self.M = hyperM
-                self.c = hyperC
-                sum_error = 0
-                self.lamb = lambda_param
-
-                for k in range(num_fold):  # K-fold validation
-                    X_train, X_val, y_train, y_val = train_test_split(x_tab, t_tab, test_size=0.2,
-                                                                      random_state=k, shuffle=True)
-                    self.entrainement(X_train, y_train)
-                    sum_err_locale = 0
-                    for i in range(X_val.shape[0]):
-                        y_hat = self.prediction(X_val[i])  # vecteur de prédiction
-                        sum_err_locale += np.sum(self.erreur(y_val[i], y_hat))
-                    sum_error += sum_err_locale
-
-                avg_err_locale = sum_error/(num_fold*X_val.shape[0])  # Moyenne des erreurs sur le K-fold
-                if(avg_err_locale < meilleur_err):
-                    meilleur_err = avg_err_locale
-                    meilleur_M = hyperM
-                    meilleur_C = hyperC
-                    meilleur_lamb = lambda_param
-
-            self.M = meilleur_M
-            self.c = meilleur_C
-            self.lamb = meilleur_lamb
-            self.entrainement(x_tab, t_tab)
+            grille = [{'M': hyperM, 'c': hyperC} for hyperM, hyperC in product(range(2, 7), np.linspace(0, 5, 100))]
+
+        # sum_error[i, j] : somme des erreurs sur le K-fold pour lambdas[i] et grille[j]
+        sum_error = np.zeros((len(lambdas), len(grille)))
+        for j, hyper in enumerate(tqdm(grille)):
+            for nom, valeur in hyper.items():
+                setattr(self, nom, valeur)
+
+            if spectral:
+                sum_error[:, j] = self.erreur_plis_spectral(plis, lambdas)
+            else:
+                for i, lambda_param in enumerate(lambdas):
+                    self.lamb = lambda_param
+                    sum_error[i, j] = self.erreur_plis(plis)
+
+        # np.argmin parcourt lambda en premier : en cas d'égalité, on garde la même
+        # combinaison que l'ancienne boucle sur product(lambdas, grille)
+        i, j = np.unravel_index(np.argmin(sum_error), sum_error.shape)
+        self.lamb = lambdas[i]
+        for nom, valeur in grille[j].items():
+            setattr(self, nom, valeur)
+        self.entrainement(x_tab, t_tab)
 
     def affichage(self, x_tab, t_tab):
 
@@ -274,7 +388,7 @@ class MAPnoyau:
         iy = np.arange(x_tab[:, 1].min(), x_tab[:, 1].max(), 0.1)
         iX, iY = np.meshgrid(ix, iy)
         x_vis = np.hstack([iX.reshape((-1, 1)), iY.reshape((-1, 1))])
-        contour_out = np.array([self.prediction(x) for x in x_vis])
+        contour_out, _ = self.predict_batch(x_vis)
         contour_out = contour_out.reshape(iX.shape)
 
         plt.contourf(iX, iY, contour_out > 0.5)
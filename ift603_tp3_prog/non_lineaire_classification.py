@@ -4,6 +4,7 @@ Execution dans un terminal
 
 Exemple:
    python non_lineaire_classification.py rbf 100 200 0 0
+   python non_lineaire_classification.py rbf 100000 200 0 0 200 kmeans
 
    Eliott THOMAS         —  21 164 874
    Lilian FAVRE GARCIA   —  21 153 421
@@ -11,6 +12,7 @@ Exemple:
 
 """
 
+import numpy as np
 from map_noyau import MAPnoyau
 import gestion_donnees as gd
 import sys
@@ -38,11 +40,13 @@ def analyse_erreur(err_train, err_test):
 
 def main():
     if len(sys.argv) < 6:
-        usage = "\n Usage: python non_lineaire_classification.py type_noyau nb_train nb_test lin validation\
+        usage = "\n Usage: python non_lineaire_classification.py type_noyau nb_train nb_test lin validation [nb_reperes] [selection]\
         \n\n\t type_noyau: rbf, lineaire, polynomial, sigmoidal\
         \n\t nb_train, nb_test: nb de donnees d'entrainement et de test\
         \n\t lin : 0: donnees non lineairement separables, 1: donnees lineairement separable\
-        \n\t validation: 0: pas de validation croisee,  1: validation croisee\n"
+        \n\t validation: 0: pas de validation croisee,  1: validation croisee\
+        \n\t nb_reperes (optionnel): nb de points reperes de l'approximation de Nyström\
+        \n\t selection (optionnel): choix des points reperes, uniforme (defaut), kmeans ou levier\n"
         print(usage)
         return
 
@@ -51,26 +55,30 @@ def main():
     nb_test = int(sys.argv[3])
     lin_sep = int(sys.argv[4])
     vc = bool(int(sys.argv[5]))
+    nb_reperes = int(sys.argv[6]) if len(sys.argv) > 6 else None
+    selection = sys.argv[7] if len(sys.argv) > 7 else 'uniforme'
+
+    if vc and nb_reperes is not None:
+        print("\n La validation croisee utilise la methode a noyau exacte (matrice N x N) : elle ne peut pas"
+              " etre combinee avec l'approximation de Nyström (nb_reperes)\n")
+        return
 
     # On génère les données d'entraînement et de test
     generateur_donnees = gd.GestionDonnees(nb_train, nb_test, lin_sep)
     [x_train, t_train, x_test, t_test] = generateur_donnees.generer_donnees()
 
     # On entraine le modèle
-    mp = MAPnoyau(noyau=type_noyau)
+    mp = MAPnoyau(noyau=type_noyau, nb_reperes=nb_reperes, selection=selection)
 
     if vc is False:
         mp.entrainement(x_train, t_train)
     else:
         mp.validation_croisee(x_train, t_train)
 
-    meanErr_train = 0
-    meanErr_test = 0
-    for cpt in range(x_train.shape[0]):
-        meanErr_train += mp.erreur(t_train[cpt], mp.prediction(x_train[cpt]))
-
-    for cpt in range(x_test.shape[0]):
-        meanErr_test += mp.erreur(t_test[cpt], mp.prediction(x_test[cpt]))
+    predictions_train, _ = mp.predict_batch(x_train)
+    predictions_test, _ = mp.predict_batch(x_test)
+    meanErr_train = np.sum(mp.erreur(t_train, predictions_train))
+    meanErr_test = np.sum(mp.erreur(t_test, predictions_test))
 
     err_train = meanErr_train/x_train.shape[0]*100
     err_test = meanErr_test/x_test.shape[0]*100